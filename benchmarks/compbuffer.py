@@ -0,0 +1,62 @@
+"""
+Misst das Kodieren und Dekodieren der komprimierten Datenübertragung
+
+Aufruf: python benchmarks/compbuffer.py [Anzahl Datenaustausche]
+
+Die Korrektheit des Codecs prüfen die Tests in tests/test_compbuffer.py.
+"""
+
+import random
+import sys
+import time
+from array import array
+
+from ijmfttxt.ftrobopy.ftrobopy import compBuffer
+
+# words in one frame of the compressed exchange
+WORDS = 54
+
+
+def frames(cycles):
+    # successive frames in which up to 10 words change, like motor speeds
+    # and distances do while a program runs
+    result = []
+    previous = [0] * WORDS
+    for _ in range(cycles):
+        words = list(previous)
+        for i in random.sample(range(WORDS), random.randint(0, 10)):
+            words[i] = random.choice((0, 1, random.randint(0, 0xFFFF)))
+        result.append((words, previous))
+        previous = words
+    return result
+
+
+def main(cycles=2000):
+    data = frames(cycles)
+    buf = compBuffer()
+
+    encoded = []
+    start = time.perf_counter()
+    for words, previous in data:
+        buf.Reset()
+        buf.AddWords(words, previous)
+        buf.Finish()
+        encoded.append(bytes(buf.GetCompBuffer()))
+    encode_time = time.perf_counter() - start
+
+    out = array("H", bytes(2 * WORDS))
+    start = time.perf_counter()
+    for compressed in encoded:
+        buf.Reset()
+        buf.m_compressed = memoryview(compressed)
+        buf.GetWords(out)
+    decode_time = time.perf_counter() - start
+
+    print(
+        "compBuffer: %d frames, encode %.1f us, decode %.1f us per frame"
+        % (cycles, encode_time / cycles * 1e6, decode_time / cycles * 1e6)
+    )
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -12,32 +12,29 @@ motor_vr = txt.motor(3)
 # Get Motor connected to Output 4
 motor_hr = txt.motor(4)
 
+# Group the four motors, so they always start and stop at the same time
+drive = ijmfttxt.MotorGroup(motor_hl, motor_vl, motor_vr, motor_hr)
+
 # Get proximity sensor connected via i2c-connection
 gesture_sensor = txt.gestureSensor()
 
 # Turn gesture sensor on
 gesture_sensor.turnOn()
 
+# Detect gestures in the background, so getGesture() never blocks the motors
+gesture_sensor.startListening()
+
 # Method for setting motor speed acording to drive direction
 def controll_robot(ud, lr):
     if ud != 0:
         # Moving forwards/backwards
-        motor_hl.setSpeed(8 * ud)
-        motor_vl.setSpeed(8 * ud)
-        motor_vr.setSpeed(8 * ud)
-        motor_hr.setSpeed(8 * ud)
+        drive.set_speeds([8 * ud, 8 * ud, 8 * ud, 8 * ud])
     elif lr != 0:
         # Moving to the left/right
-        motor_hl.setSpeed(8 * lr)
-        motor_vr.setSpeed(8 * -lr)
-        motor_vl.setSpeed(8 * lr)
-        motor_hr.setSpeed(8 * -lr)
+        drive.set_speeds([8 * lr, 8 * lr, 8 * -lr, 8 * -lr])
     else:
         # Stop
-        motor_hl.stop()
-        motor_vl.stop()
-        motor_vr.stop()
-        motor_hr.stop()
+        drive.stop_all()
 
 
 # Direction for forwards/backwards
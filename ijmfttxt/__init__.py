@@ -1,9 +1,48 @@
-from .txt import TXT
-from .keyboard import Keyboard, Mouse
 from .clock import Clock
 
 __version__ = "1.9.9"
-print(f"using ijmfttxt {__version__}")
 
 sleep = Clock.sleep
 wait = Clock.wait
+
+# everything else is imported on first access (PEP 562), so importing the
+# package for Clock or color neither needs a display nor the ftrobopy module
+_LAZY = {
+    "TXT": ".txt",
+    "Keyboard": ".keyboard",
+    "Mouse": ".keyboard",
+    "MotorGroup": ".ftrobopy",
+    "MotorFuture": ".ftrobopy",
+    "wait_all": ".ftrobopy",
+    "AsyncTXT": ".aiotxt",
+    "TXTFleet": ".fleet",
+    "show_error": ".errors",
+}
+_SUBMODULES = (
+    "apds",
+    "aiotxt",
+    "color",
+    "constants",
+    "errors",
+    "fleet",
+    "ftrobopy",
+    "gesture",
+    "keyboard",
+    "txt",
+)
+
+
+def __getattr__(name):
+    from importlib import import_module
+
+    if name in _LAZY:
+        value = getattr(import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return import_module("." + name, __name__)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
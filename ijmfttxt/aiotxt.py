@@ -0,0 +1,675 @@
+"""
+asyncio Client für den fischertechnik TXT Controller
+
+AsyncTXT spricht dasselbe Protokoll wie ftrobopy, braucht aber keine eigenen
+Threads: Datenaustausch, Verbindungserhaltung, I2C- und Kamerakanal laufen
+als Koroutinen in einer einzigen Ereignisschleife. So lassen sich viele
+Controller und Sensoren gleichzeitig aus einem Programm ansteuern.
+"""
+
+import asyncio
+from typing import List, Optional
+
+from .errors import UserValueError
+from .ftrobopy import ftTXT, protocol, default_error_handler
+
+# input configuration per device kind, like the device methods of ftrobopy
+INPUT_KINDS = {
+    "button": (ftTXT.C_SWITCH, ftTXT.C_DIGITAL),
+    "trailfollower": (ftTXT.C_VOLTAGE, ftTXT.C_DIGITAL),
+    "resistor": (ftTXT.C_RESISTOR, ftTXT.C_ANALOG),
+    "ultrasonic": (ftTXT.C_ULTRASONIC, ftTXT.C_ANALOG),
+    "voltage": (ftTXT.C_VOLTAGE, ftTXT.C_ANALOG),
+    "colorsensor": (ftTXT.C_VOLTAGE, ftTXT.C_ANALOG),
+}
+
+# seconds close() waits for each of its steps, e.g. for the background tasks
+# to leave on their own
+CLOSE_TIMEOUT = 1.0
+
+
+class AsyncTXT(object):
+    """Verbindung zu einem TXT Controller für asyncio Programme
+
+    Beispiel::
+
+        async with AsyncTXT("192.168.7.2") as txt:
+            await txt.motor(1)
+            await txt.set_speed(1, 8)
+            await txt.set_distance(1, 100)
+    """
+
+    def __init__(
+        self,
+        host: str = "192.168.7.2",
+        port: int = 65000,
+        update_interval: float = 0.01,
+        keep_connection_interval: float = 1.0,
+        on_error=default_error_handler,
+    ):
+        self._host = host
+        self._port = port
+        self._update_interval = update_interval
+        self._keep_connection_interval = keep_connection_interval
+        self.handle_error = on_error
+        self.devicename = ""
+        self.version = 0
+        # streams, locks and conditions belong to the loop of connect()
+        self._main = None
+        self._i2c = None
+        self._camera = None
+        self._main_lock = None
+        self._i2c_lock = None
+        self._cycle_condition = None
+        self._frame_condition = None
+        self._closing = None
+        self._tasks = []
+        self._camera_task = None
+        self._camera_running = False
+        self._last_request = 0.0
+        self._online = False
+        # set when a request was cancelled before its response was read
+        self._out_of_step = False
+        # configuration of the master, see ftTXT.updateConfig
+        self._config_id = 0
+        self._motor_config = [1, 1, 1, 1]
+        self._uni = [(1, 1)] * 8
+        # outgoing data of the exchange cycle
+        self._pwm = [0] * 8
+        self._motor_sync = [0] * 4
+        self._motor_dist = [0] * 4
+        self._motor_cmd_id = [0] * 4
+        self._counter = [0] * 4
+        self._sound = 0
+        self._sound_index = 0
+        self._sound_repeat = 0
+        # incoming data of the exchange cycle
+        self._current_input = [0] * 8
+        self._current_counter = [0] * 4
+        self._current_counter_value = [0] * 4
+        self._current_counter_cmd_id = [0] * 4
+        self._current_motor_cmd_id = [0] * 4
+        self._current_sound_cmd_id = 0
+        self._current_ir = [0] * 26
+        self._cycle = 0
+        self._cycle_time = 0.0
+        # pending motor futures, output index -> (motor cmd id, future)
+        self._motor_futures = {}
+        self._frame = None
+        self._frame_seq = 0
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+        return False
+
+    @property
+    def online(self) -> bool:
+        """Gibt zurück, ob der Datenaustausch mit dem TXT läuft"""
+        return self._online
+
+    @property
+    def cycle(self) -> int:
+        """Anzahl der abgeschlossenen Datenaustausche"""
+        return self._cycle
+
+    @property
+    def cycle_time(self) -> float:
+        """Zeitpunkt (Uhr der Ereignisschleife) des letzten abgeschlossenen Datenaustauschs"""
+        return self._cycle_time
+
+    async def connect(self):
+        """Verbindet mit dem TXT und startet den Datenaustausch im Hintergrund"""
+        self._main_lock = asyncio.Lock()
+        self._i2c_lock = asyncio.Lock()
+        self._cycle_condition = asyncio.Condition()
+        self._frame_condition = asyncio.Condition()
+        self._closing = asyncio.Event()
+        self._out_of_step = False
+        self._main = await asyncio.open_connection(self._host, self._port)
+        await self.query_status()
+        (response_id,) = await self._request(
+            protocol.RESPONSE, protocol.START_ONLINE_REQUEST
+        )
+        if response_id != protocol.START_ONLINE_RESP_ID:
+            self.handle_error(
+                "WARNING: ResponseID %s of startOnline command does not match"
+                % hex(response_id),
+                None,
+            )
+            return self
+        await self.update_config()
+        self._online = True
+        self._tasks = [
+            asyncio.ensure_future(self._exchange_loop()),
+            asyncio.ensure_future(self._keep_connection()),
+        ]
+        self._i2c = await asyncio.open_connection(self._host, self._port + 2)
+        return self
+
+    async def close(self):
+        """Stoppt alle Motoren und beendet die Verbindung"""
+        # every step is bounded, a TXT that stopped answering must not keep
+        # close() from releasing the connection
+        if self._camera_task is not None:
+            try:
+                await asyncio.wait_for(self.stop_camera(), CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+        if self._online:
+            self.stop_all()
+            try:
+                await asyncio.wait_for(self.wait_cycles(1), CLOSE_TIMEOUT)
+            except asyncio.TimeoutError:
+                pass
+            self._online = False
+        # the loops leave after their current request, so no response is
+        # left unread on the main channel. Only a loop that hangs is cancelled.
+        if self._tasks:
+            self._closing.set()
+            pending = (await asyncio.wait(self._tasks, timeout=CLOSE_TIMEOUT))[1]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._release_motor_futures()
+        if self._main is not None and not self._out_of_step:
+            try:
+                await asyncio.wait_for(
+                    self._request(protocol.RESPONSE, protocol.STOP_ONLINE_REQUEST),
+                    CLOSE_TIMEOUT,
+                )
+            except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                pass
+        for streams in (self._i2c, self._main):
+            if streams is not None:
+                streams[1].close()
+        self._main = None
+        self._i2c = None
+
+    async def _request(self, response, request):
+        # sends a command on the main channel and returns the unpacked response
+        async with self._main_lock:
+            reader, writer = self._main
+            try:
+                writer.write(request)
+                await writer.drain()
+                data = await reader.readexactly(response.size)
+            except asyncio.CancelledError:
+                # the response would be read by the next request
+                self._out_of_step = True
+                raise
+            self._last_request = asyncio.get_running_loop().time()
+        return response.unpack(data)
+
+    async def query_status(self):
+        """Fragt Name und Firmwareversion des TXT ab
+
+        Returns:
+            Tuple[str, int]: Gerätename und Version
+        """
+        response_id, devicename, version = await self._request(
+            protocol.QUERY_STATUS_RESPONSE, protocol.QUERY_STATUS_REQUEST
+        )
+        if response_id != protocol.QUERY_STATUS_RESP_ID:
+            self.handle_error(
+                "WARNING: ResponseID %s of queryStatus command does not match"
+                % hex(response_id),
+                None,
+            )
+        self.devicename = devicename.decode("utf-8").strip("\x00")
+        self.version = version
+        return self.devicename, self.version
+
+    async def update_config(self):
+        """Schickt die Konfiguration der Ein- und Ausgänge an den TXT"""
+        self._config_id += 1
+        uni = []
+        for mode, digital in self._uni:
+            uni += [mode, digital, b"\x00\x00"]
+        (response_id,) = await self._request(
+            protocol.RESPONSE,
+            protocol.UPDATE_CONFIG.pack(
+                protocol.UPDATE_CONFIG_ID,
+                self._config_id,
+                ftTXT.C_EXT_MASTER,
+                0,
+                0,
+                b"\x00\x00",
+                *self._motor_config,
+                *uni,
+                *[1, b"\x00\x00\x00"] * 4,
+                *[0] * 16,
+            ),
+        )
+        if response_id != protocol.UPDATE_CONFIG_RESP_ID:
+            self.handle_error(
+                "WARNING: ResponseID %s of updateConfig command does not match"
+                % hex(response_id),
+                None,
+            )
+
+    async def _exchange_loop(self):
+        try:
+            while self._online:
+                response = await self._request(
+                    protocol.EXCHANGE_RESPONSE,
+                    protocol.EXCHANGE.pack(
+                        protocol.EXCHANGE_ID,
+                        *self._pwm,
+                        *self._motor_sync,
+                        *self._motor_dist,
+                        *self._motor_cmd_id,
+                        *self._counter,
+                        self._sound,
+                        self._sound_index,
+                        self._sound_repeat,
+                        0,
+                        0,
+                    ),
+                )
+                if response[0] != protocol.EXCHANGE_RESP_ID:
+                    self.handle_error(
+                        "ResponseID %s of exchangeData command does not match"
+                        % hex(response[0]),
+                        None,
+                    )
+                    break
+                self._current_input[:] = response[1:9]
+                self._current_counter[:] = response[9:13]
+                self._current_counter_value[:] = response[13:17]
+                self._current_counter_cmd_id[:] = response[17:21]
+                self._current_motor_cmd_id[:] = response[21:25]
+                self._current_sound_cmd_id = response[25]
+                self._current_ir[:] = response[26:52]
+                self._cycle += 1
+                self._cycle_time = asyncio.get_running_loop().time()
+                self._resolve_motor_futures()
+                async with self._cycle_condition:
+                    self._cycle_condition.notify_all()
+                await self._pause(self._update_interval)
+        except (ConnectionError, asyncio.IncompleteReadError) as err:
+            self.handle_error("Network error", err)
+        finally:
+            self._online = False
+            self._release_motor_futures()
+            async with self._cycle_condition:
+                self._cycle_condition.notify_all()
+
+    async def _pause(self, seconds):
+        # sleeps, but returns at once when close() is called
+        try:
+            await asyncio.wait_for(self._closing.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _keep_connection(self):
+        # the TXT drops the connection after a while without any command, so
+        # the status is queried whenever the main channel was idle too long
+        while self._online:
+            await self._pause(self._keep_connection_interval)
+            if not self._online:
+                break
+            idle = asyncio.get_running_loop().time() - self._last_request
+            if idle > self._keep_connection_interval:
+                try:
+                    await self.query_status()
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    self._online = False
+
+    async def wait_cycles(self, n: int = 1, timeout: Optional[float] = None) -> bool:
+        """Wartet, bis n weitere Datenaustausche abgeschlossen sind
+
+        Returns:
+            bool: False bei Zeitüberschreitung oder wenn die Verbindung beendet wurde
+        """
+        target = self._cycle + n
+        async with self._cycle_condition:
+            try:
+                await asyncio.wait_for(
+                    self._cycle_condition.wait_for(
+                        lambda: self._cycle >= target or not self._online
+                    ),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                pass
+        return self._cycle >= target
+
+    # configuration
+
+    async def motor(self, output: int):
+        """Konfiguriert einen Ausgang als Motor
+
+        Args:
+            output (int): Anschlussnummer (1 bis 4)
+        """
+        if not (1 <= output <= 4):
+            raise UserValueError
+        self._motor_config[output - 1] = ftTXT.C_MOTOR
+        await self.update_config()
+        await self.wait_cycles(1)
+
+    async def output(self, num: int):
+        """Konfiguriert einen Ausgang als einzelnen Ausgang, z.B. für Lampen
+
+        Args:
+            num (int): Anschlussnummer (1 bis 8)
+        """
+        if not (1 <= num <= 8):
+            raise UserValueError
+        self._motor_config[(num - 1) // 2] = ftTXT.C_OUTPUT
+        await self.update_config()
+        await self.wait_cycles(1)
+
+    async def input(self, num: int, kind: str = "button"):
+        """Konfiguriert einen Eingang
+
+        Args:
+            num (int): Anschlussnummer (1 bis 8)
+            kind (str, optional): "button", "trailfollower", "resistor", "ultrasonic", "voltage" oder "colorsensor". Defaults to "button".
+        """
+        if not (1 <= num <= 8) or kind not in INPUT_KINDS:
+            raise UserValueError
+        self._uni[num - 1] = INPUT_KINDS[kind]
+        await self.update_config()
+        await self.wait_cycles(1)
+
+    # sensors
+
+    async def get_input(self, num: int, fresh: bool = True) -> int:
+        """Gibt den Wert eines Eingangs zurück
+
+        Args:
+            num (int): Anschlussnummer (1 bis 8)
+            fresh (bool, optional): wartet auf den nächsten Datenaustausch. Defaults to True.
+        """
+        if not (1 <= num <= 8):
+            raise UserValueError
+        if fresh:
+            await self.wait_cycles(1)
+        return self._current_input[num - 1]
+
+    async def get_inputs(self, fresh: bool = True) -> List[int]:
+        """Gibt die Werte aller Eingänge aus demselben Datenaustausch zurück"""
+        if fresh:
+            await self.wait_cycles(1)
+        return list(self._current_input)
+
+    def get_counter(self, num: int) -> int:
+        """Gibt den Zählerstand eines Zählereingangs zurück"""
+        if not (1 <= num <= 4):
+            raise UserValueError
+        return self._current_counter_value[num - 1]
+
+    # motors and outputs
+
+    def _apply_speed(self, output, speed):
+        if not (-8 <= speed <= 8):
+            raise UserValueError
+        duty = 0 if speed == 0 else int(200 / 8 * abs(speed) + 312)
+        if speed >= 0:
+            self._pwm[2 * output - 2 : 2 * output] = [duty, 0]
+        else:
+            self._pwm[2 * output - 2 : 2 * output] = [0, duty]
+
+    async def set_speed(self, output: int, speed: int):
+        """Setzt die Drehgeschwindigkeit eines Motors und wartet, bis sie gesendet wurde
+
+        Args:
+            output (int): Anschlussnummer (1 bis 4)
+            speed (int): Zahl zwischen -8 und 8
+        """
+        if not (1 <= output <= 4):
+            raise UserValueError
+        self._apply_speed(output, speed)
+        await self.wait_cycles(1)
+
+    def apply_speeds(self, speeds: List[int]):
+        """Setzt die Drehgeschwindigkeit aller vier Motoren für den nächsten Datenaustausch, ohne zu warten
+
+        Args:
+            speeds (List[int]): je Motor eine Zahl zwischen -8 und 8
+        """
+        if len(speeds) != 4 or not all(-8 <= s <= 8 for s in speeds):
+            raise UserValueError
+        for output, speed in enumerate(speeds, 1):
+            self._apply_speed(output, speed)
+
+    async def set_speeds(self, speeds: List[int]):
+        """Setzt die Drehgeschwindigkeit aller vier Motoren im selben Datenaustausch
+
+        Args:
+            speeds (List[int]): je Motor eine Zahl zwischen -8 und 8
+        """
+        self.apply_speeds(speeds)
+        await self.wait_cycles(1)
+
+    async def set_level(self, num: int, level: int):
+        """Setzt die Helligkeit eines einzelnen Ausgangs
+
+        Args:
+            num (int): Anschlussnummer (1 bis 8)
+            level (int): Zahl zwischen 0 und 512
+        """
+        if not (1 <= num <= 8) or not (0 <= level <= 512):
+            raise UserValueError
+        self._pwm[num - 1] = level
+        await self.wait_cycles(1)
+
+    def set_distance(self, output: int, distance: int, syncto: Optional[int] = None):
+        """Lässt einen Motor eine bestimmte Strecke fahren
+
+        Args:
+            output (int): Anschlussnummer (1 bis 4)
+            distance (int): Anzahl der Impulse
+            syncto (int, optional): Anschlussnummer eines Motors, der synchron mitläuft. Defaults to None.
+
+        Returns:
+            asyncio.Future: ergibt True, sobald die Strecke erreicht wurde, und False, wenn vorher ein neuer Befehl kam
+        """
+        outputs = [output] if syncto is None else [output, syncto]
+        if not all(1 <= o <= 4 for o in outputs):
+            raise UserValueError
+        for o in outputs:
+            other = 0 if syncto is None else (syncto if o == output else output)
+            self._motor_dist[o - 1] = distance
+            self._motor_sync[o - 1] = other
+            self._motor_cmd_id[o - 1] = (self._motor_cmd_id[o - 1] + 1) & 0x07
+        futures = [self._watch_motor(o - 1) for o in outputs]
+        return futures[0]
+
+    def _watch_motor(self, idx):
+        future = asyncio.get_running_loop().create_future()
+        previous = self._motor_futures.get(idx)
+        self._motor_futures[idx] = (self._motor_cmd_id[idx], future)
+        if previous is not None and not previous[1].done():
+            previous[1].set_result(False)
+        return future
+
+    def _resolve_motor_futures(self):
+        for idx, (cmd_id, future) in list(self._motor_futures.items()):
+            if future.done():
+                del self._motor_futures[idx]
+            elif self._current_motor_cmd_id[idx] == cmd_id:
+                del self._motor_futures[idx]
+                future.set_result(True)
+
+    def _release_motor_futures(self):
+        for cmd_id, future in self._motor_futures.values():
+            if not future.done():
+                future.set_result(False)
+        self._motor_futures.clear()
+
+    def finished(self, output: int) -> bool:
+        """Gibt zurück, ob ein Motor seine Strecke zurückgelegt hat"""
+        return self._motor_cmd_id[output - 1] == self._current_motor_cmd_id[output - 1]
+
+    def stop_all(self):
+        """Stoppt alle Motoren und Ausgänge mit dem nächsten Datenaustausch"""
+        self._pwm[:] = [0] * 8
+        for idx in range(4):
+            if self._motor_dist[idx]:
+                self._motor_dist[idx] = 0
+                self._motor_sync[idx] = 0
+                self._motor_cmd_id[idx] = (self._motor_cmd_id[idx] + 1) & 0x07
+
+    # i2c channel
+
+    async def _i2c_request(self, request, response_size):
+        async with self._i2c_lock:
+            reader, writer = self._i2c
+            writer.write(request)
+            await writer.drain()
+            return await reader.readexactly(response_size)
+
+    async def i2c_read(self, dev: int, reg: int, reg_len: int = 1, data_len: int = 1):
+        """Liest data_len Bytes ab Register reg eines I2C-Geräts
+
+        Returns:
+            bytes: gelesene Daten
+        """
+        data = await self._i2c_request(
+            protocol.I2C_READ_REQUEST.pack(
+                protocol.I2C_ID, protocol.I2C_READ, dev, reg_len, data_len, reg
+            ),
+            protocol.I2C_READ_RESPONSE_HEAD.size + data_len,
+        )
+        (response_id,) = protocol.I2C_RESPONSE_ID.unpack_from(data)
+        if response_id != protocol.I2C_RESP_ID:
+            self.handle_error(
+                "WARNING: ResponseID %s of I2C read command does not match"
+                % hex(response_id),
+                None,
+            )
+        return data[protocol.I2C_READ_RESPONSE_HEAD.size :]
+
+    async def i2c_write(self, dev: int, reg: int, value: int) -> bool:
+        """Schreibt einen Wert in Register reg eines I2C-Geräts
+
+        Returns:
+            bool: True, wenn der TXT den Befehl bestätigt hat
+        """
+        data = await self._i2c_request(
+            protocol.I2C_WRITE_REQUEST.pack(
+                protocol.I2C_ID, protocol.I2C_WRITE, dev, 0x02, reg, value
+            ),
+            protocol.I2C_WRITE_RESPONSE.size,
+        )
+        (response_id,) = protocol.I2C_RESPONSE_ID.unpack_from(data)
+        if response_id != protocol.I2C_RESP_ID:
+            self.handle_error(
+                "WARNING: ResponseID %s of I2C write command does not match"
+                % hex(response_id),
+                None,
+            )
+            return False
+        return True
+
+    # camera channel
+
+    async def start_camera(
+        self, width: int = 320, height: int = 240, fps: int = 15, powerline: int = 0
+    ):
+        """Startet die Kamera, die Bilder werden im Hintergrund empfangen
+
+        Args:
+            width (int, optional): Bildbreite. Defaults to 320.
+            height (int, optional): Bildhöhe. Defaults to 240.
+            fps (int, optional): Bilder pro Sekunde. Defaults to 15.
+            powerline (int, optional): Netzfrequenz, 0=automatisch, 1=50Hz, 2=60Hz. Defaults to 0.
+        """
+        if self._camera_task is not None:
+            if not self._camera_task.done():
+                return
+            # the connection to the camera was lost
+            await self.stop_camera()
+        (response_id,) = await self._request(
+            protocol.RESPONSE,
+            protocol.START_CAMERA.pack(
+                protocol.START_CAMERA_ID, width, height, fps, powerline
+            ),
+        )
+        if response_id != protocol.START_CAMERA_RESP_ID:
+            self.handle_error(
+                "WARNING: ResponseID %s of startCameraOnline command does not match"
+                % hex(response_id),
+                None,
+            )
+            return
+        # the TXT opens the camera port shortly after the answer
+        for _ in range(150):
+            try:
+                self._camera = await asyncio.open_connection(self._host, self._port + 1)
+                break
+            except OSError:
+                await asyncio.sleep(0.02)
+        else:
+            self.handle_error("Camera not connected", None)
+            return
+        self._camera_running = True
+        self._camera_task = asyncio.ensure_future(self._camera_loop())
+
+    async def stop_camera(self):
+        """Stoppt die Kamera"""
+        if self._camera_task is None:
+            return
+        self._camera_task.cancel()
+        await asyncio.gather(self._camera_task, return_exceptions=True)
+        self._camera_task = None
+        self._camera[1].close()
+        self._camera = None
+        if self._main is not None:
+            await self._request(protocol.RESPONSE, protocol.STOP_CAMERA_REQUEST)
+
+    async def _camera_loop(self):
+        reader, writer = self._camera
+        head = protocol.CAMERA_FRAME_HEAD
+        try:
+            while True:
+                response = head.unpack(await reader.readexactly(head.size))
+                if response[0] != protocol.CAMERA_FRAME_ID:
+                    self.handle_error(
+                        "WARNING: ResponseID %s of cameraOnlineFrame command does not match"
+                        % hex(response[0]),
+                        None,
+                    )
+                frame = await reader.readexactly(response[5])
+                writer.write(protocol.CAMERA_ACK_REQUEST)
+                async with self._frame_condition:
+                    self._frame = frame
+                    self._frame_seq += 1
+                    self._frame_condition.notify_all()
+        except (ConnectionError, asyncio.IncompleteReadError) as err:
+            self.handle_error("WARNING: Connection to camera lost", err)
+        finally:
+            # wakes get_camera_frame, which returns None from now on
+            self._camera_running = False
+            async with self._frame_condition:
+                self._frame_condition.notify_all()
+
+    async def get_camera_frame(self, timeout: Optional[float] = None):
+        """Wartet auf das nächste Kamerabild
+
+        Returns:
+            bytes: JPEG-Daten des Bildes oder None bei Zeitüberschreitung oder ohne Verbindung zur Kamera
+        """
+        if self._camera_task is None or self._camera_task.done():
+            return None
+        seq = self._frame_seq
+        async with self._frame_condition:
+            try:
+                await asyncio.wait_for(
+                    self._frame_condition.wait_for(
+                        lambda: self._frame_seq > seq or not self._camera_running
+                    ),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                return None
+        if self._frame_seq <= seq:
+            return None
+        return self._frame
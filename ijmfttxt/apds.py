@@ -1,25 +1,103 @@
+import queue
 import struct
+from array import array
+import threading
 import time
-from typing import List, Union
+from typing import Dict, List, NamedTuple, Union
 
+from . import color
 from . import ftrobopy
+from . import gesture
 from .constants import *
 
 
+class Sample(NamedTuple):
+    """Messwerte von Licht-, Farb- und Abstandssensor aus einer einzigen Abfrage"""
+
+    status: int
+    clear: int
+    red: int
+    green: int
+    blue: int
+    proximity: int
+
+    @property
+    def color(self) -> color.Color:
+        """Farbwerte der Messung
+
+        Returns:
+            color.Color: Objekt in dem sämtliche Farbwerte gespeichet sind
+        """
+        return color.Color(self.clear, self.red, self.green, self.blue)
+
+
 class Apds:
-    _singelton: "Apds"
+    # STATUS, CDATAL..BDATAH and PDATA are adjacent (0x93..0x9C)
+    _SAMPLE = struct.Struct("<B4HB")
 
-    def __new__(cls, *args, **kwargs):
-        if not hasattr(cls, "_singelton"):
-            cls._singelton = super().__new__(cls)
-        return cls._singelton
+    # registers which are written with their default values by reset()
+    _DEFAULTS = [
+        ("ENABLE", ENABLE, OFF),
+        ("ATIME", ATIME, ATIME_DEFAULT),
+        ("WTIME", WTIME, WTIME_DEFAULT),
+        ("PPULSE", PPULSE, PPULSE_DEFAULT),
+        ("CONFIG1", CONFIG1, CONFIG1_DEFAULT),
+        (
+            "LDRIVE/PGAIN/AGAIN in CONTROL",
+            CONTROL,
+            LDRIVE_DEFAULT | PGAIN_DEFAULT | AGAIN_DEFAULT,
+        ),
+        ("PILT", PILT, PILT_DEFAULT),
+        ("PIHT", PIHT, PIHT_DEFAULT),
+        ("AILT", AILTL, AILT_DEFAULT),
+        ("AIHT", AIHTL, AIHT_DEFAULT),
+        ("PERS", PERS, PERS_DEFAULT),
+        ("CONFIG2", CONFIG2, CONFIG2_DEFAULT),
+        ("CONFIG3", CONFIG3, CONFIG3_DEFAULT),
+        ("GPENTH", GPENTH, GPENTH_DEFAULT),
+        ("GEXTH", GEXTH, GEXTH_DEFAULT),
+        ("GCONF1", GCONF1, GCONF1_DEFAULT),
+        (
+            "GGAIN/GLDRIVE/GWTIME in GCONF2",
+            GCONF2,
+            GGAIN_DEFAULT | GLDRIVE_DEFAULT | GWTIME_DEFAULT,
+        ),
+        ("GPULSE", GPULSE, GPULSE_DEFAULT),
+        ("GCONF3", GCONF3, GCONF3_DEFAULT),
+    ]
+
+    # registers changed by the chip itself, these are never kept in the shadow
+    _VOLATILE = {
+        ID,
+        STATUS,
+        PDATA,
+        CDATAL,
+        CDATAL + 1,
+        RDATAL,
+        RDATAL + 1,
+        GDATAL,
+        GDATAL + 1,
+        BDATAL,
+        BDATAL + 1,
+        GFLVL,
+        GSTATUS,
+        GFIFO,
+        GFIFO + 1,
+        GFIFO + 2,
+        GFIFO + 3,
+        PICLEAR,
+        CICLEAR,
+        AICLEAR,
+        IFORCE,
+    }
+
+    # shadowed registers with bits the chip clears by itself (GMODE is cleared
+    # on gesture exit), these are always written even if the shadow matches
+    _SELF_CLEARING = {GCONF4}
 
     def __init__(self, outer, debug=False):
         self._TXT: ftrobopy.ftTXT = outer
-        self.gesdata_up = [0 for _ in range(32)]
-        self.gesdata_down = [0 for _ in range(32)]
-        self.gesdata_left = [0 for _ in range(32)]
-        self.gesdata_right = [0 for _ in range(32)]
+        self.gesdata = bytearray(gesture.BLOCK_SIZE)
         self.gesdata_index = 0
         self.gesdata_total = 0
         self.gesmotion = "None"
@@ -33,6 +111,9 @@ class Apds:
         self.THRESHOLD = 10
         self.SENS1 = 15
         self.SENS2 = 50
+        self._shadow: Dict[int, int] = {}
+        self._gesture_engine: Union[None, GestureEngine] = None
+        self._sampler: Union[None, Sampler] = None
         
         self.debug = debug
         
@@ -43,48 +124,31 @@ class Apds:
             print("#Apds# "+message)
     
     def reset(self) -> bool:
-        self.print_debug("Reading ID")
-        if self._read(ID)[0] != ID_VALUE:
+        self.print_debug("Reading ID and GCONF4")
+        with self._transaction() as t:
+            t.read(ID)
+            t.read(GCONF4)
+        if t.results[0] is None or t.results[0][0] != ID_VALUE:
             return False
-        self.print_debug("Setting ENABLE to OFF")
-        self._write(ENABLE, OFF)
-        self.print_debug("Setting ATIME to default")
-        self._write(ATIME, ATIME_DEFAULT)
-        self.print_debug("Setting WTIME to default")
-        self._write(WTIME, WTIME_DEFAULT)
-        self.print_debug("Setting PPULSE to default")
-        self._write(PPULSE, PPULSE_DEFAULT)
-        self.print_debug("Setting CONFIG1 to default")
-        self._write(CONFIG1, CONFIG1_DEFAULT)
-        self.print_debug("Setting LDRIVE/PGAIN/AGAIN in CONTROL to default")
-        self._write(CONTROL, LDRIVE_DEFAULT | PGAIN_DEFAULT | AGAIN_DEFAULT)
-        self.print_debug("Setting PILT to default")
-        self._write(PILT, PILT_DEFAULT)
-        self.print_debug("Setting PIHT to default")
-        self._write(PIHT, PIHT_DEFAULT)
-        self.print_debug("Setting AILT to default")
-        self._write(AILTL, AILT_DEFAULT)
-        self.print_debug("Setting AIHT to default")
-        self._write(AIHTL, AIHT_DEFAULT)
-        self.print_debug("Setting PERS to default")
-        self._write(PERS, PERS_DEFAULT)
-        self.print_debug("Setting CONFIG2 to default")
-        self._write(CONFIG2, CONFIG2_DEFAULT)
-        self.print_debug("Setting CONFIG3 to default")
-        self._write(CONFIG3, CONFIG3_DEFAULT)
-        self.print_debug("Setting GPENTH to default")
-        self._write(GPENTH, GPENTH_DEFAULT)
-        self.print_debug("Setting GEXTH to default")
-        self._write(GEXTH, GEXTH_DEFAULT)
-        self.print_debug("Setting GCONF1 to default")
-        self._write(GCONF1, GCONF1_DEFAULT)
-        self.print_debug("Setting GGAIN/GLDRIVE/GWTIME in GCONF2 to default")
-        self._write(GCONF2, GGAIN_DEFAULT | GLDRIVE_DEFAULT | GWTIME_DEFAULT)
-        self.print_debug("Setting GPULSE to default")
-        self._write(GPULSE, GPULSE_DEFAULT)
-        self.print_debug("Setting GCONF3 to default")
-        self._write(GCONF3, GCONF3_DEFAULT)
-        return True
+        self._shadow.clear()
+        if t.results[1] is not None:
+            self._shadow[GCONF4] = t.results[1][0]
+        for name, _, _ in self._DEFAULTS:
+            self.print_debug(f"Setting {name} to default")
+        return self._write_many([(r, v) for _, r, v in self._DEFAULTS])
+
+    def resync(self) -> bool:
+        registers = sorted(self._shadow)
+        self.print_debug(f"Resyncing registers {[hex(r) for r in registers]}")
+        with self._transaction() as t:
+            for register in registers:
+                t.read(register)
+        for register, value in zip(registers, t.results):
+            if value is None:
+                self._shadow.pop(register, None)
+            else:
+                self._shadow[register] = value[0]
+        return all(t.results)
 
     def __del__(self):
         self.print_debug("Disabling gesture")
@@ -96,86 +160,143 @@ class Apds:
         self.print_debug("Setting ENABLE to OFF")
         self._write(ENABLE, OFF)
 
-    def _set(self, register: int, data: int, mask: int = 0, enable: bool = True):
+    @staticmethod
+    def _apply(res: int, data: int, mask: int = 0, enable: bool = True) -> int:
         if mask != 0:
-            res = self._read(register)[0]
-            val = (res & mask) | data
-            return self._write(register, val)
-        else:
-            self.print_debug("Reading given Register")
-            res = self._read(register)[0]
-            bit = res & data
-            if bit != 0 and enable is False:
-                val = res ^ data
-            elif bit == 0 and enable is True:
-                val = res | data
+            return (res & mask) | data
+        bit = res & data
+        if bit != 0 and enable is False:
+            return res ^ data
+        elif bit == 0 and enable is True:
+            return res | data
+        return res
+
+    def _get(self, register: int) -> int:
+        if register in self._shadow:
+            return self._shadow[register]
+        self.print_debug(f"Reading register {hex(register)}")
+        value = self._read(register)[0]
+        if register not in self._VOLATILE:
+            self._shadow[register] = value
+        return value
+
+    def _set(self, register: int, data: int, mask: int = 0, enable: bool = True):
+        res = self._get(register)
+        val = self._apply(res, data, mask, enable)
+        if val == res and mask == 0 and register not in self._SELF_CLEARING:
+            return False
+        return self._write(register, val)
+
+    def _set_many(self, changes, writes=()) -> bool:
+        # changes are (register, data, mask, enable) tuples as for _set, the
+        # new values are computed from the shadow and written back in one
+        # transaction together with the plain (register, value) writes
+        registers = []
+        for register, *_ in changes:
+            if register not in registers:
+                registers.append(register)
+        missing = [r for r in registers if r not in self._shadow]
+        if missing:
+            self.print_debug(f"Reading registers {[hex(r) for r in missing]}")
+            with self._transaction() as t:
+                for register in missing:
+                    t.read(register)
+            for register, value in zip(missing, t.results):
+                if value is not None and register not in self._VOLATILE:
+                    self._shadow[register] = value[0]
+        new = {r: self._shadow[r] for r in registers if r in self._shadow}
+        for register, data, mask, enable in changes:
+            if register in new:
+                new[register] = self._apply(new[register], data, mask, enable)
+        values = list(writes)
+        for register, value in new.items():
+            if value != self._shadow[register] or register in self._SELF_CLEARING:
+                values.append((register, value))
+        return self._write_many(values)
+
+    def _write_many(self, values) -> bool:
+        with self._transaction() as t:
+            for register, value in values:
+                t.write(register, value)
+        for (register, value), ok in zip(values, t.results):
+            if ok and register not in self._VOLATILE:
+                self._shadow[register] = value
             else:
-                return False
-            return self._write(register, val)
+                self._shadow.pop(register, None)
+        return all(t.results)
 
     def enable_proximity(self):
-        self.print_debug("Setting PGAIN in CONTROL to default")
-        self._set(CONTROL, PGAIN_DEFAULT, mask=PGAIN_MASK)
-        self.print_debug("Setting LDRIVE in CONTROL to default")
-        self._set(CONTROL, LDRIVE_DEFAULT, mask=LDRIVE_MASK)
-        self.print_debug("Setting PON in ENABLE to True")
-        self._set(ENABLE, ENABLE_PON, enable=True)
-        self.print_debug("Setting PEN in ENABLE to True")
-        self._set(ENABLE, ENABLE_PEN, enable=True)
+        self.print_debug("Setting PGAIN/LDRIVE in CONTROL and PON/PEN in ENABLE")
+        self._set_many(
+            [
+                (CONTROL, PGAIN_DEFAULT, PGAIN_MASK, True),
+                (CONTROL, LDRIVE_DEFAULT, LDRIVE_MASK, True),
+                (ENABLE, ENABLE_PON, 0, True),
+                (ENABLE, ENABLE_PEN, 0, True),
+            ]
+        )
 
     def disable_proximity(self):
         self.print_debug("Setting PEN in ENABLE to False")
-        self._set(ENABLE, ENABLE_PEN, False)
+        self._set(ENABLE, ENABLE_PEN, enable=False)
 
     def get_proximity(self) -> int:
         self.print_debug("Reading PDATA")
         return self._read(PDATA)[0]
 
     def enable_light(self):
-        self.print_debug("Setting AGAIN in CONTROL to default")
-        self._set(CONTROL, AGAIN_DEFAULT, mask=AGAIN_MASK)
-        self.print_debug("Setting PON in ENABLE to True")
-        self._set(ENABLE, ENABLE_PON, enable=True)
-        self.print_debug("Setting AEN in ENABLE to True")
-        self._set(ENABLE, ENABLE_AEN, enable=True)
+        self.print_debug("Setting AGAIN in CONTROL and PON/AEN in ENABLE")
+        self._set_many(
+            [
+                (CONTROL, AGAIN_DEFAULT, AGAIN_MASK, True),
+                (ENABLE, ENABLE_PON, 0, True),
+                (ENABLE, ENABLE_AEN, 0, True),
+            ]
+        )
 
     def disable_light(self):
-        self.print_debug("Setting EAN in ENABLE to False")
-        self._set(ENABLE, ENABLE_AEN, False)
+        self.print_debug("Setting AEN in ENABLE to False")
+        self._set(ENABLE, ENABLE_AEN, enable=False)
 
     def get_rgbc(self) -> List[int]:
         self.print_debug("READING CDATA")
         return self._read(CDATAL, register_len=2, data_len=8)
 
+    def sample(self) -> Sample:
+        self.print_debug("Reading STATUS, CDATA, RDATA, GDATA, BDATA and PDATA")
+        buffer = self._TXT.i2c_read(
+            ADR, STATUS, data_len=self._SAMPLE.size, debug=self.debug
+        )
+        return Sample._make(self._SAMPLE.unpack(buffer))
+
     def enable_gesture(self):
         self.reset_gesture_param()
-        self.print_debug("Setting WTIME to default")
-        self._write(WTIME, WTIME_RESET)
-        self.print_debug("Setting PPULSE to default")
-        self._write(PPULSE, G_PPULSE_DEFAULT)
-        self.print_debug("Setting LEDBOOST in CONFIG2 to 200")
-        self._set(CONFIG2, LEDBOOST_200, mask=LEDBOOST_MASK)
-        self.print_debug("Setting GIEN in GCONF4 to True")
-        self._set(GCONF4, GCONF4_GIEN, True)
-        self.print_debug("Setting GMODE in GCONF4 to True")
-        self._set(GCONF4, GCONF4_GMODE, enable=True)
-        self.print_debug("Setting PON in ENABLE to True")
-        self._set(ENABLE, ENABLE_PON, enable=True)
-        self.print_debug("Setting WEN in ENABLE to True")
-        self._set(ENABLE, ENABLE_WEN, enable=True)
-        self.print_debug("Setting PEN in ENABLE to True")
-        self._set(ENABLE, ENABLE_PEN, enable=True)
-        self.print_debug("Setting GEN in ENABLE to True")
-        self._set(ENABLE, ENABLE_GEN, enable=True)
+        self.print_debug("Setting WTIME/PPULSE to gesture defaults, LEDBOOST to 200")
+        self.print_debug("Setting GIEN/GMODE in GCONF4 and PON/WEN/PEN/GEN in ENABLE")
+        self._set_many(
+            [
+                (CONFIG2, LEDBOOST_200, LEDBOOST_MASK, True),
+                (GCONF4, GCONF4_GIEN, 0, True),
+                (GCONF4, GCONF4_GMODE, 0, True),
+                (ENABLE, ENABLE_PON, 0, True),
+                (ENABLE, ENABLE_WEN, 0, True),
+                (ENABLE, ENABLE_PEN, 0, True),
+                (ENABLE, ENABLE_GEN, 0, True),
+            ],
+            writes=[(WTIME, WTIME_RESET), (PPULSE, G_PPULSE_DEFAULT)],
+        )
 
     def disable_gesture(self):
+        self.stop_gesture_engine()
         self.reset_gesture_param()
-        self.print_debug("Setting GIEN in GCONF4 to False")
-        self._set(GCONF4, GCONF4_GIEN, enable=False)
-        self.print_debug("Setting GMODE in GCONF4 to False")
-        self._set(GCONF4, GCONF4_GMODE, enable=False)
-        self.print_debug("Setting GEN in ENABLE to False")
-        self._set(ENABLE, ENABLE_GEN, enable=False)
+        self.print_debug("Setting GIEN/GMODE in GCONF4 and GEN in ENABLE to False")
+        self._set_many(
+            [
+                (GCONF4, GCONF4_GIEN, 0, False),
+                (GCONF4, GCONF4_GMODE, 0, False),
+                (ENABLE, ENABLE_GEN, 0, False),
+            ]
+        )
 
     def is_gesture_available(self) -> bool:
         self.print_debug("Reading GSTATUS")
@@ -208,173 +329,129 @@ class Apds:
         self.gesmotion = "NONE"
 
     def get_gesture(self) -> Union[bool, str]:
-        fifo_level = 0
-        fifo_data = None
-        motion = "NONE"
-        
         aval = not self.is_gesture_available()
-        self.print_debug("Reading ENABLE")
-        if aval or self._read(ENABLE)[0] & ENABLE_PON == 0:
+        if aval or self._get(ENABLE) & ENABLE_PON == 0:
             return False
 
         while True:
             time.sleep(0.03)
-            self.print_debug("Reading GSTATUS")
-            gstatus = self._read(GSTATUS)[0]
-            if (gstatus & GSTATUS_GVALID) == GSTATUS_GVALID:
-                self.print_debug("Reading GFLVL")
-                fifo_level = self._read(GFLVL)[0]
-                if fifo_level > 0:
-                    self.print_debug("Reading GFIFO")
-                    fifo_data = self._read(GFIFO, data_len=4 * fifo_level)
-                    bytes_read = len(fifo_data)
-                    if bytes_read >= 4:
-                        for i in range(0, bytes_read, 4):
-                            self.gesdata_up[self.gesdata_index] = fifo_data[i + 0]
-                            self.gesdata_down[self.gesdata_index] = fifo_data[i + 1]
-                            self.gesdata_left[self.gesdata_index] = fifo_data[i + 2]
-                            self.gesdata_right[self.gesdata_index] = fifo_data[i + 3]
-                            self.gesdata_index += 1
-                            self.gesdata_total += 1
-                        if self.process_data():
-                            self.decode_gesture()
-                        self.gesdata_index = 0
-                        self.gesdata_total = 0
-            else:
+            if not self.read_gesture_fifo():
                 time.sleep(0.03)
-                self.decode_gesture()
-                motion = self.gesmotion
-                self.reset_gesture_param()
-                return motion
+                return self.finish_gesture()
 
-    def process_data(self) -> bool:
-        u_first = 0
-        d_first = 0
-        l_first = 0
-        r_first = 0
-        u_last = 0
-        d_last = 0
-        l_last = 0
-        r_last = 0
-        ud_ratio_first = 0
-        lr_ratio_first = 0
-        ud_ratio_last = 0
-        lr_ratio_last = 0
-        ud_delta = 0
-        lr_delta = 0
-        if self.gesdata_total <= 4:
+    def read_gesture_fifo(self) -> bool:
+        # drains the gesture fifo into gesdata and feeds it to process_data,
+        # returns False as soon as the fifo holds no valid data anymore.
+        # GFLVL and GSTATUS are adjacent and read as one block, then exactly
+        # GFLVL datasets are burst read from GFIFO. Every fifo read pops a
+        # dataset, so reading more than GFLVL would drop datasets that arrive
+        # in between and return stale data past the fill level.
+        self.print_debug("Reading GFLVL/GSTATUS")
+        fifo_level, gstatus = self._read(GFLVL, data_len=2)
+        if (gstatus & GSTATUS_GVALID) != GSTATUS_GVALID:
             return False
-        if self.gesdata_total <= 32 and self.gesdata_total > 0:
-            for i in range(self.gesdata_total):
-                if (
-                    self.gesdata_up[i] > self.THRESHOLD
-                    and self.gesdata_down[i] > self.THRESHOLD
-                    and self.gesdata_left[i] > self.THRESHOLD
-                    and self.gesdata_right[i] > self.THRESHOLD
-                ):
-                    u_first = self.gesdata_up[i]
-                    d_first = self.gesdata_down[i]
-                    l_first = self.gesdata_left[i]
-                    r_first = self.gesdata_right[i]
-                    break
-            if u_first == 0 or d_first == 0 or l_first == 0 or r_first == 0:
+        count = min(fifo_level, gesture.DATASETS - self.gesdata_index)
+        if count > 0:
+            size = gesture.CHANNELS * count
+            self.print_debug("Reading GFIFO")
+            fifo_data = self._TXT.i2c_read(
+                ADR, GFIFO, data_len=size, debug=self.debug
+            )
+            if len(fifo_data) != size:
                 return False
-            for i in range(self.gesdata_total - 1, 0, -1):
-                if (
-                    self.gesdata_up[i] > self.THRESHOLD
-                    and self.gesdata_down[i] > self.THRESHOLD
-                    and self.gesdata_left[i] > self.THRESHOLD
-                    and self.gesdata_right[i] > self.THRESHOLD
-                ):
-                    u_last = self.gesdata_up[i]
-                    d_last = self.gesdata_down[i]
-                    l_last = self.gesdata_left[i]
-                    r_last = self.gesdata_right[i]
-                    break
-        try:
-            ud_ratio_first = ((u_first - d_first) * 100) / (u_first + d_first)
-            lr_ratio_first = ((l_first - r_first) * 100) / (l_first + r_first)
-            ud_ratio_last = ((u_last - d_last) * 100) / (u_last + d_last)
-            lr_ratio_last = ((l_last - r_last) * 100) / (l_last + r_last)
-        except ZeroDivisionError:
+            start = gesture.CHANNELS * self.gesdata_index
+            self.gesdata[start : start + size] = fifo_data
+            self.gesdata_index += count
+            self.gesdata_total += count
+            if self.process_data():
+                self.decode_gesture()
+            self.gesdata_index = 0
+            self.gesdata_total = 0
+        return True
+
+    @property
+    def gesdata_up(self) -> memoryview:
+        return memoryview(self.gesdata)[0 :: gesture.CHANNELS]
+
+    @property
+    def gesdata_down(self) -> memoryview:
+        return memoryview(self.gesdata)[1 :: gesture.CHANNELS]
+
+    @property
+    def gesdata_left(self) -> memoryview:
+        return memoryview(self.gesdata)[2 :: gesture.CHANNELS]
+
+    @property
+    def gesdata_right(self) -> memoryview:
+        return memoryview(self.gesdata)[3 :: gesture.CHANNELS]
+
+    def finish_gesture(self) -> str:
+        self.decode_gesture()
+        motion = self.gesmotion
+        self.reset_gesture_param()
+        return motion
+
+    def start_gesture_engine(
+        self, interval: float = 0.03, fifo_threshold: int = GFIFOTH_4, maxsize=16
+    ) -> "GestureEngine":
+        if self._gesture_engine is None or not self._gesture_engine.is_alive():
+            self.reset_gesture_param()
+            self._gesture_engine = GestureEngine(
+                self, interval, fifo_threshold, maxsize
+            )
+            self._gesture_engine.start()
+        return self._gesture_engine
+
+    def stop_gesture_engine(self):
+        if self._gesture_engine is not None:
+            self._gesture_engine.stop()
+            self._gesture_engine = None
+
+    @property
+    def gesture_engine(self) -> Union[None, "GestureEngine"]:
+        return self._gesture_engine
+
+    def start_sampler(self, rate: float = 50, size: int = 256) -> "Sampler":
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = Sampler(self, rate, size)
+            self._sampler.start()
+        return self._sampler
+
+    def stop_sampler(self):
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler = None
+
+    @property
+    def sampler(self) -> Union[None, "Sampler"]:
+        return self._sampler
+
+    def latest_sample(self) -> Union[None, Sample]:
+        # newest sample of a running sampler, None means a read is needed
+        if self._sampler is not None and self._sampler.running:
+            return self._sampler.latest
+        return None
+
+    def process_data(self) -> bool:
+        deltas = gesture.chunk_deltas(self.gesdata, self.gesdata_total, self.THRESHOLD)
+        if deltas is None:
             return False
-        ud_delta = ud_ratio_last - ud_ratio_first
-        lr_delta = lr_ratio_last - lr_ratio_first
-        self.ud_delta += ud_delta
-        self.lr_delta += lr_delta
-        if self.ud_delta >= self.SENS1:
-            self.ud_count = 1
-        elif self.ud_delta <= -self.SENS1:
-            self.ud_count = -1
-        else:
-            self.ud_count = 0
-        if self.lr_delta >= self.SENS1:
-            self.lr_count = 1
-        elif self.lr_delta <= -self.SENS1:
-            self.lr_count = -1
-        else:
-            self.lr_count = 0
-        if self.ud_count == 0 and self.lr_count == 0:
-            if abs(ud_delta) < self.SENS2 and abs(lr_delta) < self.SENS2:
-                if ud_delta == 0 and lr_delta == 0:
-                    self.near_count += 1
-                elif ud_delta != 0 or lr_delta != 0:
-                    self.far_count += 1
-                if self.near_count >= 10 and self.far_count >= 2:
-                    if ud_delta == 0 and lr_delta == 0:
-                        self.state = "near"
-                    elif ud_delta != 0 and lr_delta != 0:
-                        self.state = "far"
-                    return True
-        else:
-            if abs(ud_delta) < self.SENS2 and abs(lr_delta) < self.SENS2:
-                if ud_delta == 0 and lr_delta == 0:
-                    self.near_count += 1
-                if self.near_count >= 10:
-                    self.ud_count = 0
-                    self.lr_count = 0
-                    self.ud_delta = 0
-                    self.lr_delta = 0
-        return False
+        return gesture.accumulate(self, deltas[0], deltas[1], self.SENS1, self.SENS2)
 
     def decode_gesture(self) -> bool:
         self.print_debug(f"{self.ud_count=}; {self.lr_count=}")
-        if self.ud_count == -1 and self.lr_count == 0:
-            self.gesmotion = "UP"
-        elif self.ud_count == 1 and self.lr_count == 0:
-            self.gesmotion = "DOWN"
-        elif self.ud_count == 0 and self.lr_count == 1:
-            self.gesmotion == "RIGHT"
-        elif self.ud_count == 0 and self.lr_count == -1:
-            self.gesmotion == "LEFT"
-        elif self.ud_count == -1 and self.lr_count == 1:
-            if abs(self.ud_delta) > abs(self.lr_delta):
-                self.gesmotion = "UP"
-            else:
-                self.gesmotion = "RIGHT"
-        elif self.ud_count == 1 and self.lr_count == -1:
-            if abs(self.ud_delta) > abs(self.lr_delta):
-                self.gesmotion = "DOWN"
-            else:
-                self.gesmotion = "LEFT"
-        elif self.ud_count == -1 and self.lr_count == -1:
-            if abs(self.ud_delta) > abs(self.lr_delta):
-                self.gesmotion = "UP"
-            else:
-                self.gesmotion = "LEFT"
-        elif self.ud_count == 1 and self.lr_count == 1:
-            if abs(self.ud_delta) > abs(self.lr_delta):
-                self.gesmotion = "DOWN"
-            else:
-                self.gesmotion = "RIGHT"
-        else:
-            return False
-        return True
+        return gesture.decode_into(self)
+
+    def _transaction(self) -> ftrobopy.i2cTransaction:
+        return self._TXT.i2c_transaction(ADR, debug=self.debug)
 
     def _write(self, register: int, data: int) -> bool:
         if self._TXT.i2c_write(ADR, register, data, debug=self.debug):
+            if register not in self._VOLATILE:
+                self._shadow[register] = data
             return True
         else:
+            self._shadow.pop(register, None)
             return False
 
     def _read(
@@ -393,3 +470,168 @@ class Apds:
             return list(unpacked)
         return [0] * (data_len // 2)
 
+
+class GestureEngine(threading.Thread):
+    # drains the gesture fifo of an Apds in the background and puts every
+    # decoded gesture into a queue, so callers never block on the sensor
+
+    FIFO_THRESHOLDS = {1: GFIFOTH_1, 4: GFIFOTH_4, 8: GFIFOTH_8, 16: GFIFOTH_16}
+
+    def __init__(
+        self,
+        apds: Apds,
+        interval: float = 0.03,
+        fifo_threshold: int = GFIFOTH_4,
+        maxsize: int = 16,
+    ):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._apds = apds
+        self._interval = interval
+        self._fifo_threshold = fifo_threshold
+        self._stop_event = threading.Event()
+        self._gestures: "queue.Queue[str]" = queue.Queue(maxsize)
+
+    def run(self):
+        self._apds.print_debug("Setting GFIFOTH in GCONF1")
+        self._apds._set(GCONF1, self._fifo_threshold, mask=GFIFOTH_MASK)
+        collecting = False
+        while not self._stop_event.wait(self._interval):
+            try:
+                if self._apds.read_gesture_fifo():
+                    collecting = True
+                elif collecting:
+                    collecting = False
+                    motion = self._apds.finish_gesture()
+                    if motion != "NONE":
+                        self._put(motion)
+            except Exception as err:
+                print("ERROR in gesture thread: ", err)
+                self._stop_event.set()
+                return
+
+    def _put(self, motion: str):
+        # keep the newest gestures if the consumer is too slow
+        while True:
+            try:
+                self._gestures.put_nowait(motion)
+                return
+            except queue.Full:
+                try:
+                    self._gestures.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+
+    @property
+    def running(self) -> bool:
+        return self.is_alive() and not self._stop_event.is_set()
+
+    def get(self, timeout: Union[None, float] = 0) -> str:
+        try:
+            if timeout == 0:
+                return self._gestures.get_nowait()
+            return self._gestures.get(timeout=timeout)
+        except queue.Empty:
+            return "NONE"
+
+    def __iter__(self):
+        while self.running or not self._gestures.empty():
+            motion = self.get(self._interval)
+            if motion != "NONE":
+                yield motion
+
+
+class Sampler(threading.Thread):
+    # polls STATUS..PDATA of an Apds at a fixed rate and keeps the last
+    # samples in a ring buffer, so getters can answer without any I/O
+
+    def __init__(self, apds: Apds, rate: float = 50, size: int = 256):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._apds = apds
+        self._interval = 1 / rate
+        self._size = size
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self._times = array("d", bytes(8 * size))
+        self._channels = [array("H", bytes(2 * size)) for _ in range(4)]
+        self._proximity = array("B", bytes(size))
+        self._status = array("B", bytes(size))
+        self._count = 0
+        self._latest: Union[None, Sample] = None
+        self._latest_time = 0.0
+
+    def run(self):
+        next_time = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                sample = self._apds.sample()
+            except Exception as err:
+                print("ERROR in sampler thread: ", err)
+                self._stop_event.set()
+                return
+            self._store(time.monotonic(), sample)
+            # keep the rate stable instead of adding the read time to it
+            next_time = max(next_time + self._interval, time.monotonic())
+            self._stop_event.wait(next_time - time.monotonic())
+
+    def _store(self, timestamp: float, sample: Sample):
+        with self._lock:
+            i = self._count % self._size
+            self._times[i] = timestamp
+            self._status[i] = sample.status
+            for channel, value in zip(self._channels, sample[1:5]):
+                channel[i] = value
+            self._proximity[i] = sample.proximity
+            self._count += 1
+            self._latest = sample
+            self._latest_time = timestamp
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+
+    @property
+    def running(self) -> bool:
+        return self.is_alive() and not self._stop_event.is_set()
+
+    @property
+    def latest(self) -> Union[None, Sample]:
+        return self._latest
+
+    @property
+    def latest_time(self) -> float:
+        return self._latest_time
+
+    def __len__(self) -> int:
+        return min(self._count, self._size)
+
+    def _indices(self, n: Union[None, int]) -> range:
+        available = min(self._count, self._size)
+        n = available if n is None else max(0, min(n, available))
+        return range(self._count - n, self._count)
+
+    def history(self, n: Union[None, int] = None) -> List[Sample]:
+        # returns the last n samples, oldest first
+        with self._lock:
+            return [
+                Sample(
+                    self._status[j],
+                    self._channels[0][j],
+                    self._channels[1][j],
+                    self._channels[2][j],
+                    self._channels[3][j],
+                    self._proximity[j],
+                )
+                for j in (i % self._size for i in self._indices(n))
+            ]
+
+    def timestamps(self, n: Union[None, int] = None) -> List[float]:
+        with self._lock:
+            return [self._times[i % self._size] for i in self._indices(n)]
@@ -1,8 +1,7 @@
-from typing import Tuple, Dict, Union
+from typing import Tuple, Dict, List, Sequence, Union
 
 from ijmfttxt.errors import error_handler
 
-
 COLORS: Dict[str, Tuple[int, int]] = {
     "Rot1": (340, 360),
     "Grün": (70, 160),
@@ -15,10 +14,60 @@ COLORS: Dict[str, Tuple[int, int]] = {
     "Violett": (265, 285),
 }
 
+# all names Color.name and ColorBatch can return, ColorBatch.indices point here
+NAMES: Tuple[str, ...] = ("Schwarz", "Weiß", "Grau") + tuple(
+    dict.fromkeys("Rot" if k in ("Rot1", "Rot2") else k for k in COLORS)
+)
+_BLACK, _WHITE, _GREY = 0, 1, 2
+
+
+def _numpy():
+    # numpy is optional and only imported by ColorBatch, so it does not slow
+    # down the import of the package
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _hue_class(hue: float) -> int:
+    for k, r in COLORS.items():
+        if hue >= r[0] and hue <= r[1]:
+            return NAMES.index("Rot" if k in ("Rot1", "Rot2") else k)
+    return -1
+
+
+# every boundary in COLORS is an integer, so a hue between k and k + 1
+# always has the class of k + 0.5 and only integer hues need a second table
+_HUE_TABLE = bytes(_hue_class(k + 0.5) for k in range(360))
+_HUE_TABLE_EXACT = bytes(_hue_class(k) for k in range(361))
+
+
+def hue_index(hue: float) -> int:
+    """Index in NAMES der Farbe eines Farbtons
+
+    Args:
+        hue (float): Farbton zwischen 0 und 360
+
+    Returns:
+        int: Index in NAMES oder -1
+    """
+    if not 0 <= hue <= 360:
+        return -1
+    k = int(hue)
+    if k == hue:
+        return _HUE_TABLE_EXACT[k]
+    return _HUE_TABLE[k]
+
 
 class Color:
     """Klasse zum speichern verschiedenster Farbwerte"""
 
+    # colour spaces are computed on first access and cached, most callers
+    # only look at one of them (e.g. name or raw)
+    __slots__ = ("_rc", "_rr", "_rg", "_rb", "_rgb", "_hsv", "_hls", "_drgb")
+
     def __init__(self, raw_clear: int, raw_red: int, raw_green: int, raw_blue: int):
         # raw color datat
         self._rc = raw_clear
@@ -26,17 +75,11 @@ class Color:
         self._rg = raw_green
         self._rb = raw_blue
 
-        # rgb color data
-        self._r, self._g, self._b = self._raw_to_rgb()
-
-        # hsv color data
-        self._h, self._s, self._v = self._rgb_to_hsv()
-
-        # hls colo data
-        self._s2, self._l = self._rgb_to_hls()
-
-        # display color data
-        self._dr, self._dg, self._db = self._rgb_to_dis()
+        # rgb, hsv, hls and display color data
+        self._rgb: Union[None, Tuple[float, float, float]] = None
+        self._hsv: Union[None, Tuple[float, float, float]] = None
+        self._hls: Union[None, Tuple[float, float]] = None
+        self._drgb: Union[None, Tuple[int, int, int]] = None
 
     @property
     def raw(self) -> Tuple[int, int, int]:
@@ -63,7 +106,9 @@ class Color:
         Returns:
             Tuple[float]: Zahlen zwischen 0 und 1
         """
-        return self._r, self._g, self._b
+        if self._rgb is None:
+            self._rgb = self._raw_to_rgb()
+        return self._rgb
 
     @property
     def hsv(self) -> Tuple[float, float, float]:
@@ -72,7 +117,9 @@ class Color:
         Returns:
             Tuple[float]: Zahl zwischen 0 und 360, Zahlen zwischen 0 und 1
         """
-        return self._h, self._s, self._v
+        if self._hsv is None:
+            self._hsv = self._rgb_to_hsv()
+        return self._hsv
 
     @property
     def hsl(self) -> Tuple[float, float, float]:
@@ -81,7 +128,9 @@ class Color:
         Returns:
             Tuple[float]: Zahl zwischen 0 und 360, Zahlen zwischen 0 und 1
         """
-        return self._h, self._s2, self._l
+        if self._hls is None:
+            self._hls = self._rgb_to_hls()
+        return self.hsv[0], self._hls[0], self._hls[1]
 
     @property
     def drgb(self) -> Tuple[int, int, int]:
@@ -90,7 +139,9 @@ class Color:
         Returns:
             Tuple[int]: Zahlen zwischen 0 und 255
         """
-        return self._dr, self._dg, self._db
+        if self._drgb is None:
+            self._drgb = self._rgb_to_dis()
+        return self._drgb
 
     @property
     def r(self) -> float:
@@ -99,7 +150,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._r
+        return self.rgb[0]
 
     @property
     def g(self) -> float:
@@ -108,7 +159,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._g
+        return self.rgb[1]
 
     @property
     def b(self) -> float:
@@ -117,7 +168,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._b
+        return self.rgb[2]
 
     @property
     def dr(self) -> int:
@@ -126,7 +177,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._dr
+        return self.drgb[0]
 
     @property
     def dg(self) -> int:
@@ -135,7 +186,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._dg
+        return self.drgb[1]
 
     @property
     def db(self) -> int:
@@ -144,7 +195,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._db
+        return self.drgb[2]
 
     @property
     def h(self) -> float:
@@ -153,7 +204,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._h
+        return self.hsv[0]
 
     @property
     def sv(self) -> float:
@@ -162,7 +213,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._s
+        return self.hsv[1]
 
     def sl(self) -> float:
         """HSL-Saturation-Wert
@@ -170,7 +221,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._s2
+        return self.hsl[1]
 
     @property
     def v(self) -> float:
@@ -179,7 +230,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._v
+        return self.hsv[2]
 
     def l(self) -> float:
         """HSL-Lightness-Wert
@@ -187,7 +238,7 @@ class Color:
         Returns:
             float: Zahl zwischen 0 und 1
         """
-        return self._l
+        return self.hsl[2]
 
     @property
     def name(self) -> Union[None, str]:
@@ -196,38 +247,38 @@ class Color:
         Returns:
             str: Möglich: "Schwarz", "Weiß", "Grau", "Rot", "Grün", "Blau", "Orange", "Gelb", "Türkis", "Violett, "Magenta"
         """
-        if self._v <= 0.2:
+        hue, sat, value = self.hsv
+        if value <= 0.2:
             return "Schwarz"
-        if self._s <= 0.15:
-            if self._v >= 0.7:
+        if sat <= 0.15:
+            if value >= 0.7:
                 return "Weiß"
-            elif self._v >= 0.2:
+            elif value >= 0.2:
                 return "Grau"
             else:
                 return "black"
-        for k, r in COLORS.items():
-            if self._h >= r[0] and self._h <= r[1]:
-                if k == "Rot1" or k == "Rot2":
-                    return "Rot"
-                else:
-                    return k
+        index = hue_index(hue)
+        if index >= 0:
+            return NAMES[index]
+        return None
 
     def _raw_to_rgb(self) -> Tuple[float, float, float]:
         max_color = max(self.raw)
         return self._rr / max_color, self._rg / max_color, self._rb / max_color
 
     def _rgb_to_hsv(self) -> Tuple[float, float, float]:
-        max_color = max(self._r, self._g, self._b)
-        min_color = min(self._r, self._g, self._b)
+        r, g, b = self.rgb
+        max_color = max(r, g, b)
+        min_color = min(r, g, b)
         hue = 0
         if max_color == min_color:
             hue = 0
-        elif max_color == self._r:
-            hue = 60 * (self._g - self._b) / (max_color - min_color)
-        elif max_color == self._g:
-            hue = 60 * (2 + (self._b - self._r) / (max_color - min_color))
-        elif max_color == self._b:
-            hue = 60 * (4 + (self._r - self._g) / (max_color - min_color))
+        elif max_color == r:
+            hue = 60 * (g - b) / (max_color - min_color)
+        elif max_color == g:
+            hue = 60 * (2 + (b - r) / (max_color - min_color))
+        elif max_color == b:
+            hue = 60 * (4 + (r - g) / (max_color - min_color))
         if hue < 0:
             hue += 360
         if max_color != 0:
@@ -238,8 +289,8 @@ class Color:
         return hue, sat, value
 
     def _rgb_to_hls(self) -> Tuple[float, float]:
-        max_color = max(self._r, self._g, self._b)
-        min_color = min(self._r, self._g, self._b)
+        max_color = max(self.rgb)
+        min_color = min(self.rgb)
         if max_color == 0 or min_color == 1:
             sat = 0
         else:
@@ -248,7 +299,110 @@ class Color:
         return sat, lum
 
     def _rgb_to_dis(self) -> Tuple[int, int, int]:
-        return int(self._r * 255), int(self._g * 255), int(self._b * 255)
+        r, g, b = self.rgb
+        return int(r * 255), int(g * 255), int(b * 255)
 
     def __repr__(self) -> str:
         return f"Color(raw_clear: {self._rc}; raw_red: {self._rr}; raw_green: {self._rg}; raw_blue: {self._rb})"
+
+
+class ColorBatch:
+    """Rechnet viele Farbmessungen auf einmal um, z.B. zum Auswerten aufgezeichneter Messungen
+
+    Ist numpy installiert, sind alle Werte numpy-Arrays und werden gemeinsam
+    berechnet, sonst Listen von Tupeln. Messungen ohne Farbwerte (alle 0)
+    gelten als Schwarz.
+
+    Args:
+        samples: N Messungen mit je (raw_clear, raw_red, raw_green, raw_blue)
+    """
+
+    __slots__ = ("rawc", "rgb", "hsv", "hsl", "drgb", "indices")
+
+    def __init__(self, samples: Sequence[Sequence[int]]):
+        numpy = _numpy()
+        if numpy is not None:
+            self._convert_numpy(numpy, samples)
+        else:
+            self._convert(samples)
+
+    def _convert(self, samples):
+        self.rawc = [tuple(sample) for sample in samples]
+        self.rgb, self.hsv, self.hsl, self.drgb, self.indices = [], [], [], [], []
+        for rawc in self.rawc:
+            if max(rawc[1:]) == 0:
+                self.rgb.append((0.0, 0.0, 0.0))
+                self.hsv.append((0, 0, 0.0))
+                self.hsl.append((0, 0, 0.0))
+                self.drgb.append((0, 0, 0))
+                self.indices.append(_BLACK)
+                continue
+            c = Color(*rawc)
+            self.rgb.append(c.rgb)
+            self.hsv.append(c.hsv)
+            self.hsl.append(c.hsl)
+            self.drgb.append(c.drgb)
+            self.indices.append(_name_index(*c.hsv))
+
+    def _convert_numpy(self, numpy, samples):
+        self.rawc = numpy.asarray(samples).reshape(-1, 4)
+        raw = self.rawc[:, 1:].astype(numpy.float64)
+        max_raw = raw.max(axis=1, initial=0)
+        self.rgb = raw / numpy.where(max_raw == 0, 1, max_raw)[:, None]
+        r, g, b = self.rgb.T
+        max_color = self.rgb.max(axis=1, initial=0)
+        min_color = self.rgb.min(axis=1, initial=1)
+        delta = max_color - min_color
+        # same operations and branch order as Color, so results match exactly
+        with numpy.errstate(divide="ignore", invalid="ignore"):
+            hue = numpy.where(
+                max_color == r,
+                60 * (g - b) / delta,
+                numpy.where(
+                    max_color == g,
+                    60 * (2 + (b - r) / delta),
+                    60 * (4 + (r - g) / delta),
+                ),
+            )
+            hue = numpy.where(delta == 0, 0, hue)
+            hue = numpy.where(hue < 0, hue + 360, hue)
+            sat = numpy.where(max_color != 0, delta / max_color, 0)
+            sat2 = numpy.where(
+                (max_color == 0) | (min_color == 1),
+                0,
+                delta / (1 - numpy.abs(max_color + min_color - 1)),
+            )
+        lum = (max_color + min_color) / 2
+        self.hsv = numpy.stack((hue, sat, max_color), axis=1)
+        self.hsl = numpy.stack((hue, sat2, lum), axis=1)
+        self.drgb = (self.rgb * 255).astype(numpy.int64)
+
+        k = numpy.clip(hue, 0, 360).astype(numpy.intp)
+        exact = numpy.frombuffer(_HUE_TABLE_EXACT, dtype=numpy.uint8)
+        interior = numpy.frombuffer(_HUE_TABLE + b"\x00", dtype=numpy.uint8)
+        indices = numpy.where(hue == k, exact[k], interior[k]).astype(numpy.int8)
+        grey = numpy.where(max_color >= 0.7, _WHITE, _GREY)
+        indices = numpy.where(sat <= 0.15, grey, indices)
+        self.indices = numpy.where(max_color <= 0.2, _BLACK, indices)
+
+    def __len__(self) -> int:
+        return len(self.rawc)
+
+    def __getitem__(self, i: int) -> Color:
+        return Color(*(int(v) for v in self.rawc[i]))
+
+    def names(self) -> List[str]:
+        """Farbnamen aller Messungen
+
+        Returns:
+            List[str]: Namen wie bei Color.name
+        """
+        return [NAMES[i] for i in self.indices]
+
+
+def _name_index(hue: float, sat: float, value: float) -> int:
+    if value <= 0.2:
+        return _BLACK
+    if sat <= 0.15:
+        return _WHITE if value >= 0.7 else _GREY
+    return hue_index(hue)
@@ -1,8 +1,8 @@
-from tkinter import Tk
-from tkinter.messagebox import showerror
-
-
 def show_error():
+    # tkinter is only loaded when an internal error has to be shown
+    from tkinter import Tk
+    from tkinter.messagebox import showerror
+
     Tk().withdraw()
     showerror(
         title="Internal Error",
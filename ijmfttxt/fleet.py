@@ -0,0 +1,253 @@
+"""
+Ansteuerung vieler TXT Controller aus einem Programm
+
+Alle Controller einer TXTFleet teilen sich eine einzige asyncio
+Ereignisschleife in einem Hintergrund-Thread, egal wie viele es sind.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .aiotxt import AsyncTXT
+from .errors import error_handler, UserValueError
+
+
+class _LoopThread(threading.Thread):
+    # runs the event loop shared by all controllers of a fleet
+
+    def __init__(self):
+        threading.Thread.__init__(self, daemon=True)
+        self.loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+
+    def run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(self._started.set)
+        self.loop.run_forever()
+
+    def start(self):
+        threading.Thread.start(self)
+        self._started.wait()
+
+    def call(self, coro, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # the coroutine must not keep running after the timeout
+            future.cancel()
+            raise
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.join()
+        # tasks that are still running are cancelled and may clean up
+        tasks = asyncio.all_tasks(self.loop)
+        if tasks:
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self.loop.close()
+
+
+class TXTFleet(object):
+    """Verbindet sich mit mehreren TXT Controllern gleichzeitig
+
+    Beispiel::
+
+        with TXTFleet(["192.168.8.10", "192.168.8.11"]) as fleet:
+            fleet.motor(1)
+            fleet.start_all([8, 0, 0, 0])
+            fleet.stop_all()
+    """
+
+    @error_handler
+    def __init__(
+        self,
+        hosts: Sequence[Union[str, Tuple[str, int]]],
+        update_interval: float = 0.01,
+        timeout: float = 5.0,
+    ):
+        """Erzeugt eine neue Flotte, verbunden wird mit connect()
+
+        Args:
+            hosts: IP-Adressen der Controller, optional als (Adresse, Port)
+            update_interval (float, optional): Abstand zwischen zwei Datenaustauschen in Sekunden. Defaults to 0.01.
+            timeout (float, optional): maximale Wartezeit für Befehle an alle Controller. Defaults to 5.0.
+        """
+        if not hosts:
+            raise UserValueError
+        self._timeout = timeout
+        self._errors: Dict[str, Optional[str]] = {}
+        self.controllers: List[AsyncTXT] = []
+        self.names: List[str] = []
+        for host in hosts:
+            host, port = (host, 65000) if isinstance(host, str) else host
+            name = host if port == 65000 else "%s:%d" % (host, port)
+            self.names.append(name)
+            self._errors[name] = None
+            self.controllers.append(
+                AsyncTXT(
+                    host,
+                    port,
+                    update_interval=update_interval,
+                    on_error=self._error_handler(name),
+                )
+            )
+        self._thread = _LoopThread()
+        self._thread.start()
+
+    def _error_handler(self, name):
+        def handle_error(message, exception):
+            self._errors[name] = message if exception is None else str(exception)
+
+        return handle_error
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self.controllers)
+
+    def __getitem__(self, index) -> AsyncTXT:
+        return self.controllers[index]
+
+    def __iter__(self):
+        return iter(self.controllers)
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """Führt eine Koroutine in der Ereignisschleife der Flotte aus und gibt ihr Ergebnis zurück"""
+        return self._thread.call(coro, self._timeout if timeout is None else timeout)
+
+    def _all(self):
+        return list(zip(self.names, self.controllers))
+
+    def _online(self):
+        return [(name, txt) for name, txt in self._all() if txt.online]
+
+    async def _each(self, controllers, func, timeout=None):
+        # runs func(txt) for all (name, txt) pairs concurrently, a failing or
+        # stalled controller is recorded in health() and does not stop the others
+        timeout = self._timeout if timeout is None else timeout
+        results = await asyncio.gather(
+            *(asyncio.wait_for(func(txt), timeout) for name, txt in controllers),
+            return_exceptions=True,
+        )
+        for (name, txt), result in zip(controllers, results):
+            if isinstance(result, BaseException):
+                self._errors[name] = repr(result)
+        return results
+
+    @error_handler
+    def connect(self) -> Dict[str, bool]:
+        """Verbindet mit allen Controllern gleichzeitig
+
+        Returns:
+            dict: je Controller, ob die Verbindung hergestellt wurde
+        """
+
+        async def connect(txt):
+            try:
+                await asyncio.wait_for(txt.connect(), self._timeout)
+            except asyncio.TimeoutError:
+                # closes the streams and tasks of the half opened connection
+                await txt.close()
+                raise
+
+        # the timeout inside connect() fires first and closes the connection
+        self.run(self._each(self._all(), connect, self._timeout + 1), self._timeout + 2)
+        return {name: txt.online for name, txt in zip(self.names, self.controllers)}
+
+    @error_handler
+    def close(self):
+        """Stoppt alle Motoren und trennt alle Verbindungen"""
+
+        async def close(txt):
+            await txt.close()
+
+        try:
+            self.run(self._each(self._all(), close), self._timeout + 1)
+        finally:
+            self._thread.stop()
+
+    @error_handler
+    def motor(self, output: int):
+        """Konfiguriert auf allen Controllern einen Ausgang als Motor
+
+        Args:
+            output (int): Anschlussnummer (1 bis 4)
+        """
+        if not (1 <= output <= 4):
+            raise UserValueError
+
+        async def motor(txt):
+            await txt.motor(output)
+
+        self.run(self._each(self._online(), motor), self._timeout + 1)
+
+    @error_handler
+    def stop_all(self):
+        """Stoppt alle Motoren aller Controller und wartet, bis der Befehl gesendet wurde"""
+
+        async def stop_all():
+            controllers = self._online()
+            for name, txt in controllers:
+                txt.stop_all()
+            await self._each(controllers, lambda txt: txt.wait_cycles(1))
+
+        self.run(stop_all(), self._timeout + 1)
+
+    @error_handler
+    def start_all(self, speeds: Sequence):
+        """Setzt die Motorgeschwindigkeiten aller Controller gleichzeitig
+
+        Die Werte aller Controller werden ohne Unterbrechung gesetzt, so dass
+        jeder Controller sie mit seinem nächsten Datenaustausch erhält.
+
+        Args:
+            speeds: vier Geschwindigkeiten (-8 bis 8) für alle Controller oder eine solche Liste je Controller
+        """
+        if speeds and isinstance(speeds[0], int):
+            speeds = [speeds] * len(self.controllers)
+        if len(speeds) != len(self.controllers):
+            raise UserValueError
+        for s in speeds:
+            if len(s) != 4 or not all(-8 <= v <= 8 for v in s):
+                raise UserValueError
+
+        async def start_all():
+            for txt, s in zip(self.controllers, speeds):
+                if txt.online:
+                    txt.apply_speeds(s)
+            await self._each(self._online(), lambda txt: txt.wait_cycles(1))
+
+        self.run(start_all(), self._timeout + 1)
+
+    @error_handler
+    def health(self) -> Dict[str, dict]:
+        """Gibt den Zustand jedes Controllers zurück
+
+        Returns:
+            dict: je Controller online, Anzahl der Datenaustausche (cycles), Sekunden seit dem letzten Datenaustausch (age) und der letzte Fehler (error)
+        """
+
+        async def health():
+            now = asyncio.get_running_loop().time()
+            return {
+                name: {
+                    "online": txt.online,
+                    "cycles": txt.cycle,
+                    "age": now - txt.cycle_time if txt.cycle else None,
+                    "error": self._errors[name],
+                }
+                for name, txt in zip(self.names, self.controllers)
+            }
+
+        return self.run(health())
@@ -6,16 +6,27 @@
 """
 
 from __future__ import print_function
+import io
 import os
 import sys
+import errno
 import socket
+import selectors
 import threading
 import struct
 import time
+import concurrent.futures
+from array import array
 from math import log
-from typing import List, Any
+from typing import Any, List, NamedTuple
 
 from ..errors import error_handler, type_checker, UserValueError
+from . import protocol
+
+try:
+    import zlib
+except ImportError:
+    zlib = None
 
 try:
     import ftTA2py
@@ -147,12 +158,32 @@ class ftTXT(object):
         self._bt_joystick_stop_event.set()
         self._exchange_data_lock = threading.RLock()
         self._camera_data_lock = threading.Lock()
+        # camera mode of startCameraOnline and throughput of finished modes
+        self._m_width = 320
+        self._m_height = 240
+        self._m_framerate = 15
+        self._m_powerlinefreq = 0
+        self._camera_stats = {}
+        self._camera_decoder = None
         self._bt_joystick_lock = threading.RLock()
         self._socket_lock = threading.Lock()
+        self._i2c_lock = threading.Lock()
+        # send and receive buffers, only used while holding the socket locks
+        self._recv_buffer = bytearray(protocol.RECV_SIZE)
+        self._i2c_recv_buffer = bytearray(protocol.RECV_SIZE)
+        self._update_config_codec = protocol.Codec(protocol.UPDATE_CONFIG)
+        self._start_camera_codec = protocol.Codec(protocol.START_CAMERA)
+        self._i2c_read_codec = protocol.Codec(protocol.I2C_READ_REQUEST)
+        self._i2c_write_codec = protocol.Codec(protocol.I2C_WRITE_REQUEST)
         self._txt_thread = None
         self._camera_thread = None
         self._bt_joystick_thread = None
         self._update_status = 0
+        # number of completed exchange cycles, see wait_cycles()
+        self._exchange_cycle = 0
+        self._cycle_condition = threading.Condition(threading.Lock())
+        # pending MotorFuture per motor, index -> (motor cmd id, future)
+        self._motor_futures = {}
         self._update_timer = time.time()
         self._cycle_count = 0
         self._sound_timer = self._update_timer
@@ -160,6 +191,8 @@ class ftTXT(object):
         self._config_id = [0, 0]  # [0]:master [1]:slave
         self._config_id_old = 0  # only used in direct mode
         self._TransferDataChanged = False
+        # active configBatch, see configure()
+        self._config_batch = None
         self._ftX1_pgm_state_req = 0
         self._ftX1_old_FtTransfer = 0
         self._ftX1_dummy = b"\x00\x00"
@@ -320,6 +353,21 @@ class ftTXT(object):
             self._camera_thread is not None
         )
 
+    def _request(self, response, request, *values):
+        # sends a command on the main channel and returns the unpacked
+        # response, or None if the size of the answer does not match
+        self._socket_lock.acquire()
+        try:
+            if isinstance(request, protocol.Codec):
+                request = request.pack(*values)
+            self._sock.send(request)
+            count = self._sock.recv_into(self._recv_buffer)
+            if count != response.size:
+                return None
+            return response.unpack_from(self._recv_buffer)
+        finally:
+            self._socket_lock.release()
+
     def queryStatus(self):
 
         if self._use_TransferAreaMode:
@@ -335,17 +383,13 @@ class ftTXT(object):
             self._m_version = 0x4010500
             self._m_firmware = "firmware version not detected"
             return self._m_devicename, self._m_version
-        m_id = 0xDC21219A
-        m_resp_id = 0xBAC9723E
-        buf = struct.pack("<I", m_id)
-        self._socket_lock.acquire()
-        res = self._sock.send(buf)
-        data = self._sock.recv(512)
-        self._socket_lock.release()
-        fstr = "<I16sI"
+        m_resp_id = protocol.QUERY_STATUS_RESP_ID
+        response = self._request(
+            protocol.QUERY_STATUS_RESPONSE, protocol.QUERY_STATUS_REQUEST
+        )
         response_id = 0
-        if len(data) == struct.calcsize(fstr):
-            response_id, m_devicename, m_version = struct.unpack(fstr, data)
+        if response is not None:
+            response_id, m_devicename, m_version = response
         else:
             m_devicename = bytes()
             m_version = 0
@@ -365,58 +409,67 @@ class ftTXT(object):
 
     def i2c_read(self, dev, reg, reg_len=1, data_len=1, debug=False) -> bytes:
 
-        m_id = 0xB9DB3B39
-        m_resp_id = 0x87FD0D90
-        m_command = 0x01
-        buf = struct.pack(">IBIIHH", m_id, m_command, dev, reg_len, data_len, reg)
-        if debug:
-            print("i2c_read, sendbuffer: ", end="")
-            for k in buf:
-                print(format(int(k), "02X"), end=" ")
-            print()
-        res = self._i2c_sock.send(buf)
-        data = self._i2c_sock.recv(512)
+        m_resp_id = protocol.I2C_RESP_ID
+        response_id = 0
+        self._i2c_lock.acquire()
+        try:
+            buf = self._i2c_read_codec.pack(
+                protocol.I2C_ID, protocol.I2C_READ, dev, reg_len, data_len, reg
+            )
+            if debug:
+                print("i2c_read, sendbuffer: ", end="")
+                for k in buf:
+                    print(format(int(k), "02X"), end=" ")
+                print()
+            self._i2c_sock.send(buf)
+            count = self._i2c_sock.recv_into(self._i2c_recv_buffer)
+            if count == protocol.I2C_READ_RESPONSE_HEAD.size + data_len:
+                (response_id,) = protocol.I2C_RESPONSE_ID.unpack_from(
+                    self._i2c_recv_buffer
+                )
+            data = bytes(self._i2c_recv_buffer[max(0, count - data_len) : count])
+        finally:
+            self._i2c_lock.release()
         if debug:
             print("i2c_read, receivebuffer: ", end="")
-            for k in data:
+            for k in self._i2c_recv_buffer[:count]:
                 print(format(int(k), "02X"), end=" ")
             print()
-        fstr = ">IBIHB"
-        for k in range(data_len):
-            fstr += "B"
-        response_id = 0
-        if len(data) == struct.calcsize(fstr):
-            response_id = struct.unpack(fstr, data)[0]
         if response_id != m_resp_id:
             self.handle_error(
                 "WARNING: ResponseID %s of I2C read command does not match"
                 % hex(response_id),
                 None,
             )
-        return data[-data_len:]
+        return data
 
     def i2c_write(self, dev, reg, value, debug=False):
 
-        m_id = 0xB9DB3B39
-        m_resp_id = 0x87FD0D90
-        m_command = 0x02
-        buf = struct.pack(">IBIIIB", m_id, m_command, dev, 0x02, reg, value)
-        if debug:
-            print("i2c_write, sendbuffer: ", end="")
-            for k in buf:
-                print(format(int(k), "02X"), end=" ")
-            print()
-        res = self._i2c_sock.send(buf)
-        data = self._i2c_sock.recv(512)
+        m_resp_id = protocol.I2C_RESP_ID
+        response_id = 0
+        self._i2c_lock.acquire()
+        try:
+            buf = self._i2c_write_codec.pack(
+                protocol.I2C_ID, protocol.I2C_WRITE, dev, 0x02, reg, value
+            )
+            if debug:
+                print("i2c_write, sendbuffer: ", end="")
+                for k in buf:
+                    print(format(int(k), "02X"), end=" ")
+                print()
+            self._i2c_sock.send(buf)
+            count = self._i2c_sock.recv_into(self._i2c_recv_buffer)
+            if count == protocol.I2C_WRITE_RESPONSE.size:
+                (response_id,) = protocol.I2C_RESPONSE_ID.unpack_from(
+                    self._i2c_recv_buffer
+                )
+        finally:
+            self._i2c_lock.release()
         if debug:
             print("i2c_write, receivebuffer: ", end="")
-            for k in data:
+            for k in self._i2c_recv_buffer[:count]:
                 print(format(int(k), "02X"), end=" ")
             print()
-        fstr = ">III"
-        response_id = 0
-        if len(data) == struct.calcsize(fstr):
-            response_id = struct.unpack(fstr, data)[0]
         if response_id != m_resp_id:
             self.handle_error(
                 "WARNING: ResponseID %s of I2C write command does not match"
@@ -427,33 +480,35 @@ class ftTXT(object):
         return True
 
     def i2c_write_bytes(self, dev, debug, *argv):
-        m_id = 0xB9DB3B39
-        m_resp_id = 0x87FD0D90
+        m_resp_id = protocol.I2C_RESP_ID
 
-        m_lenth = 0
-        for i in argv:
-            m_lenth += 1
-        buf = struct.pack(">IBIIBBB", m_id, m_lenth, dev, m_lenth, 0x00, 0x00, 0x00)
-        for i in argv:
-            buf += struct.pack("B", i)
+        m_lenth = len(argv)
+        buf = protocol.I2C_WRITE_BYTES_HEAD.pack(
+            protocol.I2C_ID, m_lenth, dev, m_lenth, 0x00, 0x00, 0x00
+        ) + bytes(argv)
 
         if debug:
             print("i2c_write, sendbuffer: ", end="")
             for k in buf:
                 print(format(int(k), "02X"), end=" ")
             print()
-        res = self._i2c_sock.send(buf)
-        data = self._i2c_sock.recv(512)
+        response_id = 0
+        self._i2c_lock.acquire()
+        try:
+            self._i2c_sock.send(buf)
+            count = self._i2c_sock.recv_into(self._i2c_recv_buffer)
+            if count == protocol.I2C_WRITE_RESPONSE.size:
+                (response_id,) = protocol.I2C_RESPONSE_ID.unpack_from(
+                    self._i2c_recv_buffer
+                )
+        finally:
+            self._i2c_lock.release()
 
         if debug:
             print("i2c_write, receivebuffer: ", end="")
-            for k in data:
+            for k in self._i2c_recv_buffer[:count]:
                 print(format(int(k), "02X"), end=" ")
             print()
-        fstr = ">III"
-        response_id = 0
-        if len(data) == struct.calcsize(fstr):
-            response_id = struct.unpack(fstr, data)[0]
         if response_id != m_resp_id:
             self.handle_error(
                 "WARNING: ResponseID %s of I2C write command does not match"
@@ -465,9 +520,10 @@ class ftTXT(object):
         return True
 
     def i2c_write_buffer(self, dev, buffer, m_length, debug=False):
-        m_id = 0xB9DB3B39
         buf = (
-            struct.pack(">IBIIBBB", m_id, m_length, dev, m_length, 0x00, 0x00, 0x00)
+            protocol.I2C_WRITE_BYTES_HEAD.pack(
+                protocol.I2C_ID, m_length, dev, m_length, 0x00, 0x00, 0x00
+            )
             + buffer
         )
 
@@ -476,19 +532,24 @@ class ftTXT(object):
             for k in buf:
                 print(format(int(k), "02X"), end=" ")
             print()
-        res = self._i2c_sock.send(buf)
-        data = self._i2c_sock.recv(512)
+        response_id = 0
+        self._i2c_lock.acquire()
+        try:
+            self._i2c_sock.send(buf)
+            count = self._i2c_sock.recv_into(self._i2c_recv_buffer)
+            if count == protocol.I2C_WRITE_RESPONSE.size:
+                (response_id,) = protocol.I2C_RESPONSE_ID.unpack_from(
+                    self._i2c_recv_buffer
+                )
+        finally:
+            self._i2c_lock.release()
 
         if debug:
             print("i2c_write, receivebuffer: ", end="")
-            for k in data:
+            for k in self._i2c_recv_buffer[:count]:
                 print(format(int(k), "02X"), end=" ")
             print()
-        fstr = ">III"
-        response_id = 0
-        if len(data) == struct.calcsize(fstr):
-            response_id = struct.unpack(fstr, data)[0]
-        if response_id != 0x87FD0D90:
+        if response_id != protocol.I2C_RESP_ID:
             self.handle_error(
                 "WARNING: ResponseID %s of I2C write command does not match"
                 % hex(response_id),
@@ -498,6 +559,53 @@ class ftTXT(object):
 
         return True
 
+    def i2c_transaction(self, dev, debug=False):
+
+        return i2cTransaction(self, dev, debug)
+
+    def _i2c_exchange(self, bufs, response_lengths, debug=False):
+        # send all requests back to back and read the responses in one go,
+        # the TXT answers the requests of the i2c channel strictly in order
+        buf = b"".join(bufs)
+        total = sum(response_lengths)
+        data = bytearray(total)
+        view = memoryview(data)
+        count = 0
+        if debug:
+            print("i2c_transaction, sendbuffer: ", end="")
+            for k in buf:
+                print(format(int(k), "02X"), end=" ")
+            print()
+        self._i2c_lock.acquire()
+        try:
+            self._i2c_sock.sendall(buf)
+            while count < total:
+                n = self._i2c_sock.recv_into(view[count:])
+                if n == 0:
+                    break
+                count += n
+        finally:
+            self._i2c_lock.release()
+        if debug:
+            print("i2c_transaction, receivebuffer: ", end="")
+            for k in data[:count]:
+                print(format(int(k), "02X"), end=" ")
+            print()
+        if count < total:
+            self.handle_error(
+                "WARNING: I2C transaction received %d of %d bytes" % (count, total),
+                None,
+            )
+        responses = []
+        offset = 0
+        for length in response_lengths:
+            if offset + length <= count:
+                responses.append(bytes(data[offset : offset + length]))
+            else:
+                responses.append(None)
+            offset += length
+        return responses
+
     def getDevicename(self):
 
         return self._m_devicename
@@ -536,17 +644,11 @@ class ftTXT(object):
         else:
             return
         if self._txt_thread is None:
-            m_id = 0x163FF61D
-            m_resp_id = 0xCA689F75
-            buf = struct.pack("<I64s", m_id, b"")
-            self._socket_lock.acquire()
-            res = self._sock.send(buf)
-            data = self._sock.recv(512)
-            self._socket_lock.release()
-            fstr = "<I"
+            m_resp_id = protocol.START_ONLINE_RESP_ID
+            response = self._request(protocol.RESPONSE, protocol.START_ONLINE_REQUEST)
             response_id = 0
-            if len(data) == struct.calcsize(fstr):
-                (response_id,) = struct.unpack(fstr, data)
+            if response is not None:
+                (response_id,) = response
             if response_id != m_resp_id:
                 self.handle_error(
                     "WARNING: ResponseID %s of startOnline command does not match"
@@ -592,17 +694,11 @@ class ftTXT(object):
             return
         self._txt_stop_event.set()
         self._txt_keep_connection_stop_event.set()
-        m_id = 0x9BE5082C
-        m_resp_id = 0xFBF600D2
-        buf = struct.pack("<I", m_id)
-        self._socket_lock.acquire()
-        res = self._sock.send(buf)
-        data = self._sock.recv(512)
-        self._socket_lock.release()
-        fstr = "<I"
+        m_resp_id = protocol.STOP_ONLINE_RESP_ID
+        response = self._request(protocol.RESPONSE, protocol.STOP_ONLINE_REQUEST)
         response_id = 0
-        if len(data) == struct.calcsize(fstr):
-            (response_id,) = struct.unpack(fstr, data)
+        if response is not None:
+            (response_id,) = response
         if response_id != m_resp_id:
             self.handle_error(
                 "WARNING: ResponseID %s of stopOnline command does not match"
@@ -679,6 +775,10 @@ class ftTXT(object):
         if self._directmode:
             # in direct mode i/o port configuration is performed automatically in exchangeData thread
             return
+        if self._config_batch is not None:
+            # sent once for every extension when the batch ends
+            self._config_batch.extensions.add(ext)
+            return
         if not self._firstUpdateConfig[ext]:
             if not self.isOnline():
                 self.handle_error(
@@ -686,29 +786,25 @@ class ftTXT(object):
                 )
                 return
             self._firstUpdateConfig[ext] = False
-        m_id = 0x060EF27E
-        m_resp_id = 0x9689A68C
+        m_resp_id = protocol.UPDATE_CONFIG_RESP_ID
         self._config_id[ext] += 1
-        fields = [m_id, self._config_id[ext], ext]
-        fields.append(self._ftX1_pgm_state_req)
-        fields.append(self._ftX1_old_FtTransfer)
-        fields.append(self._ftX1_dummy)
-        fields += self._ftX1_motor[4 * ext : 4 * ext + 4]
-        fields += self._ftX1_uni[24 * ext : 24 * ext + 24]
-        fields += self._ftX1_cnt[8 * ext : 8 * ext + 8]
-        fields += self._ftX1_motor_config[16 * ext : 16 * ext + 16]
-        buf = struct.pack(
-            "<Ihh B B 2s BBBB BB2s BB2s BB2s BB2s BB2s BB2s BB2s BB2s B3s B3s B3s B3s 16h",
-            *fields
+        response = self._request(
+            protocol.RESPONSE,
+            self._update_config_codec,
+            protocol.UPDATE_CONFIG_ID,
+            self._config_id[ext],
+            ext,
+            self._ftX1_pgm_state_req,
+            self._ftX1_old_FtTransfer,
+            self._ftX1_dummy,
+            *self._ftX1_motor[4 * ext : 4 * ext + 4],
+            *self._ftX1_uni[24 * ext : 24 * ext + 24],
+            *self._ftX1_cnt[8 * ext : 8 * ext + 8],
+            *self._ftX1_motor_config[16 * ext : 16 * ext + 16]
         )
-        self._socket_lock.acquire()
-        res = self._sock.send(buf)
-        data = self._sock.recv(512)
-        self._socket_lock.release()
-        fstr = "<I"
         response_id = 0
-        if len(data) == struct.calcsize(fstr):
-            (response_id,) = struct.unpack(fstr, data)
+        if response is not None:
+            (response_id,) = response
         if response_id != m_resp_id:
             self.handle_error(
                 "WARNING: ResponseID %s of updateConfig command does not match"
@@ -720,38 +816,38 @@ class ftTXT(object):
             self._txt_keep_connection_stop_event.set()
         return None
 
-    def startCameraOnline(self):
+    def startCameraOnline(self, width=320, height=240, fps=15, powerline=0):
 
         if self._directmode:
             # ftrobopy.py does not support camera in direct mode, please use native camera support (e.g. ftrobopylib.so or opencv)
             return
-        if self._camera_stop_event.is_set():
-            self._camera_stop_event.clear()
-        else:
+        if width <= 0 or height <= 0 or fps <= 0 or powerline not in (0, 1, 2):
+            raise UserValueError
+        if not self._camera_stop_event.is_set():
+            return
+        # a camera thread that ended on its own is replaced, but only once
+        # it has really finished
+        if not self._retireCamera():
+            print("WARNING: previous camera thread still running, camera not started")
             return
         if self._camera_thread is None:
-            m_id = 0x882A40A6
-            m_resp_id = 0xCF41B24E
-            self._m_width = 320
-            self._m_height = 240
-            self._m_framerate = 15
-            self._m_powerlinefreq = 0  # 0=auto, 1=50Hz, 2=60Hz
-            buf = struct.pack(
-                "<I4i",
-                m_id,
+            m_resp_id = protocol.START_CAMERA_RESP_ID
+            self._m_width = width
+            self._m_height = height
+            self._m_framerate = fps
+            self._m_powerlinefreq = powerline  # 0=auto, 1=50Hz, 2=60Hz
+            response = self._request(
+                protocol.RESPONSE,
+                self._start_camera_codec,
+                protocol.START_CAMERA_ID,
                 self._m_width,
                 self._m_height,
                 self._m_framerate,
                 self._m_powerlinefreq,
             )
-            self._socket_lock.acquire()
-            res = self._sock.send(buf)
-            data = self._sock.recv(512)
-            self._socket_lock.release()
-            fstr = "<I"
             response_id = 0
-            if len(data) == struct.calcsize(fstr):
-                (response_id,) = struct.unpack(fstr, data)
+            if response is not None:
+                (response_id,) = response
             if response_id != m_resp_id:
                 print(
                     "WARNING: ResponseID ",
@@ -759,11 +855,15 @@ class ftTXT(object):
                     " of startCameraOnline command does not match",
                 )
             else:
+                # every camera thread gets its own stop event, so a thread
+                # that is still ending can never stop or feed its successor
+                self._camera_stop_event = threading.Event()
                 self._camera_thread = camera(
                     self._host,
                     self._port + 1,
                     self._camera_data_lock,
                     self._camera_stop_event,
+                    (width, height, fps, powerline),
                 )
                 self._camera_thread.setDaemon(True)
                 self._camera_thread.start()
@@ -776,43 +876,143 @@ class ftTXT(object):
         if not self.cameraIsOnline():
             return
         self._camera_stop_event.set()
-        m_id = 0x17C31F2F
-        m_resp_id = 0x4B3C1EB6
-        buf = struct.pack("<I", m_id)
-        self._socket_lock.acquire()
-        res = self._sock.send(buf)
-        data = self._sock.recv(512)
-        self._socket_lock.release()
-        fstr = "<I"
+        m_resp_id = protocol.STOP_CAMERA_RESP_ID
+        response = self._request(protocol.RESPONSE, protocol.STOP_CAMERA_REQUEST)
         response_id = 0
-        if len(data) == struct.calcsize(fstr):
-            (response_id,) = struct.unpack(fstr, data)
+        if response is not None:
+            (response_id,) = response
         if response_id != m_resp_id:
             print(
                 "WARNING: ResponseID ",
                 hex(response_id),
                 " of stopCameraOnline command does not match",
             )
-        self._camera_thread = None
+        self._retireCamera()
         return
 
+    def setCameraMode(self, width=None, height=None, fps=None, powerline=None):
+
+        # restarts the camera with a new resolution, frame rate or power line
+        # frequency, None keeps the current value. The receive buffers are
+        # sized for the new frames by the new camera thread.
+        if self._directmode:
+            return
+        width = self._m_width if width is None else width
+        height = self._m_height if height is None else height
+        fps = self._m_framerate if fps is None else fps
+        powerline = self._m_powerlinefreq if powerline is None else powerline
+        self.stopCameraOnline()
+        self.startCameraOnline(width, height, fps, powerline)
+
+    def startCameraDecoder(self, grayscale=False, scale=1):
+
+        # starts a cameraDecoder that turns every frame into a numpy array
+        # (or a PIL image without numpy), optionally in grayscale and scaled
+        # down by an integer factor. Returns False if Pillow is missing, the
+        # frames are then passed on as JPEG bytes.
+        if not isinstance(scale, int) or scale < 1:
+            raise UserValueError
+        self.stopCameraDecoder()
+        self._camera_decoder = cameraDecoder(self, grayscale, scale)
+        self._camera_decoder.start()
+        return self._camera_decoder.decoding
+
+    def stopCameraDecoder(self):
+
+        decoder = self._camera_decoder
+        self._camera_decoder = None
+        if decoder is not None:
+            decoder.stop()
+            decoder.join(1.0)
+
+    def getDecodedFrame(self, wait=False, timeout=None):
+
+        # returns the latest decoded frame as CameraFrame, with wait=True a
+        # frame that has not been returned before. None if no decoder runs
+        # or no frame arrived within timeout.
+        decoder = self._camera_decoder
+        if decoder is None:
+            return None
+        return decoder.get(wait, timeout)
+
+    def getCameraMode(self):
+
+        return self._m_width, self._m_height, self._m_framerate, self._m_powerlinefreq
+
+    def _retireCamera(self):
+
+        # stops and joins the camera thread and keeps its throughput,
+        # returns False if the thread did not end in time
+        thread = self._camera_thread
+        if thread is None:
+            return True
+        thread.stop()
+        thread.join(2.0)
+        if thread.is_alive():
+            return False
+        self._camera_thread = None
+        self._camera_stats = self._addCameraStats(self._camera_stats, thread)
+        return True
+
+    @staticmethod
+    def _addCameraStats(stats, thread):
+
+        stats = dict(stats)
+        mode = (thread.width, thread.height, thread.fps, thread.powerline)
+        frames, size, seconds = thread.stats()
+        old = stats.get(mode, (0, 0, 0.0))
+        stats[mode] = (old[0] + frames, old[1] + size, old[2] + seconds)
+        return stats
+
+    def getCameraStats(self):
+
+        # measured throughput per camera mode (width, height, fps, powerline)
+        # as dict with frames, bytes, seconds, fps and bytes_per_second, the
+        # running mode included
+        stats = self._camera_stats
+        thread = self._camera_thread
+        if thread is not None:
+            stats = self._addCameraStats(stats, thread)
+        result = {}
+        for mode, (frames, size, seconds) in stats.items():
+            result[mode] = {
+                "frames": frames,
+                "bytes": size,
+                "seconds": seconds,
+                "fps": frames / seconds if seconds > 0 else 0.0,
+                "bytes_per_second": size / seconds if seconds > 0 else 0.0,
+            }
+        return result
+
     def getCameraFrame(self):
 
+        # returns the JPEG data of the next camera frame as bytes
+        return self._waitCameraFrame(lambda thread: thread.getCameraFrame(0.2))
+
+    def getCameraFrameView(self):
+
+        # like getCameraFrame, but returns a memoryview into the receive ring
+        # of the camera thread without copying the frame
+        return self._waitCameraFrame(lambda thread: thread.getCameraFrameView(0.2))
+
+    def get_frame(self, after_seq=None, timeout=None):
+
+        # waits for a camera frame with a sequence number above after_seq
+        # (default: the frame taken last) and returns it as CameraFrame with
+        # seq, timestamp, data and the number of dropped frames in between.
+        # Returns None on timeout or if the camera is not running.
+        if self._directmode or not self.cameraIsOnline():
+            return None
+        return self._camera_thread.get_frame(after_seq, timeout)
+
+    def _waitCameraFrame(self, take):
+
         if self._directmode:
             return
         if self.cameraIsOnline():
-            count = 0
-            frame = None
-            while frame == None:
-                frame = self._camera_thread.getCameraFrame()
-                count += 1
-                if frame != None:
-                    if len(frame) == 0:
-                        frame = None
-                if count > 20:
-                    print("Timeout while getting new frame from camera")
-                    return None
-                time.sleep(0.01)
+            frame = take(self._camera_thread)
+            if frame is None:
+                print("Timeout while getting new frame from camera")
             return frame
         else:
             return None
@@ -825,8 +1025,8 @@ class ftTXT(object):
             self._exchange_data_lock.acquire()
             self._motor_cmd_id[4 * ext + idx] += 1
             self._motor_cmd_id[4 * ext + idx] &= 0x07
-            self._exchange_data_lock.release()
             self._TransferDataChanged = True
+            self._exchange_data_lock.release()
         return None
 
     def getMotorCmdId(self, idx=None, ext=C_EXT_MASTER):
@@ -864,8 +1064,8 @@ class ftTXT(object):
         self._exchange_data_lock.acquire()
         self._counter[4 * ext + idx] += 1
         self._counter[4 * ext + idx] &= 0x07
-        self._exchange_data_lock.release()
         self._TransferDataChanged = True
+        self._exchange_data_lock.release()
         return None
 
     def incrSoundCmdId(self, ext=C_EXT_MASTER):
@@ -873,8 +1073,8 @@ class ftTXT(object):
         self._exchange_data_lock.acquire()
         self._sound[ext] += 1
         self._sound[ext] &= 0x0F
-        self._exchange_data_lock.release()
         self._TransferDataChanged = True
+        self._exchange_data_lock.release()
         return None
 
     def setSoundIndex(self, idx, ext=C_EXT_MASTER):
@@ -916,8 +1116,8 @@ class ftTXT(object):
 
         self._exchange_data_lock.acquire()
         self._sound_repeat[ext] = rep
-        self._exchange_data_lock.release()
         self._TransferDataChanged = True
+        self._exchange_data_lock.release()
         return None
 
     def getSoundRepeat(self, ext=C_EXT_MASTER):
@@ -975,8 +1175,8 @@ class ftTXT(object):
             return
         self._exchange_data_lock.acquire()
         self._pwm[8 * ext + idx] = value
-        self._exchange_data_lock.release()
         self._TransferDataChanged = True
+        self._exchange_data_lock.release()
         return None
 
     def stopAll(self):
@@ -1006,8 +1206,8 @@ class ftTXT(object):
             return
         self._exchange_data_lock.acquire()
         self._motor_sync[4 * ext + idx] = value
-        self._exchange_data_lock.release()
         self._TransferDataChanged = True
+        self._exchange_data_lock.release()
         return None
 
     def getMotorSyncMaster(self, idx=None, ext=C_EXT_MASTER):
@@ -1026,8 +1226,8 @@ class ftTXT(object):
             return
         self._exchange_data_lock.acquire()
         self._motor_dist[4 * ext + idx] = value
-        self._exchange_data_lock.release()
         self._TransferDataChanged = True
+        self._exchange_data_lock.release()
         return None
 
     def getMotorDistance(self, idx=None, ext=C_EXT_MASTER):
@@ -1207,13 +1407,150 @@ class ftTXT(object):
 
     def updateWait(self, minimum_time=0.001):
 
+        # minimum_time is kept for compatibility, the wait is event driven
         if self._use_TransferAreaMode:
             return
-        self._exchange_data_lock.acquire()
-        self._update_status = 0
-        self._exchange_data_lock.release()
-        while self._update_status == 0:
-            time.sleep(minimum_time)
+        if self._config_batch is not None:
+            self._config_batch.wait = True
+            return
+        self.wait_cycles(1)
+
+    def configure(self):
+
+        # with txt.configure(): collects the updateConfig() and updateWait()
+        # calls of all devices created inside the block and sends one
+        # updateConfig per extension followed by a single wait at its end
+        return configBatch(self)
+
+    def wait_cycles(self, n=1, timeout=None):
+
+        # waits until n more exchange cycles have completed, returns False on
+        # timeout or if the exchange thread stopped before
+        if self._use_TransferAreaMode:
+            return True
+        with self._cycle_condition:
+            target = self._exchange_cycle + n
+            self._cycle_condition.wait_for(
+                lambda: self._exchange_cycle >= target
+                or self._txt_stop_event.is_set(),
+                timeout,
+            )
+            return self._exchange_cycle >= target
+
+    def _watchMotorCmdId(self, idx, ext=C_EXT_MASTER):
+
+        # returns a MotorFuture that is resolved as soon as the TXT reports
+        # the current motor cmd id, the caller holds _exchange_data_lock
+        key = 4 * ext + idx
+        future = MotorFuture()
+        previous = self._motor_futures.get(key)
+        self._motor_futures[key] = (self._motor_cmd_id[key], future)
+        if previous is not None:
+            previous[1]._resolve(False)
+        return future
+
+    def _cycle_done(self, completed=True):
+
+        # called by the exchange thread after every cycle and once when it
+        # stops, so no waiter is left behind
+        with self._cycle_condition:
+            if completed:
+                self._update_status = 1
+                self._exchange_cycle += 1
+            self._cycle_condition.notify_all()
+        if self._motor_futures:
+            self._exchange_data_lock.acquire()
+            finished = [
+                key
+                for key, (cmd_id, future) in self._motor_futures.items()
+                if not completed
+                or future.done()
+                or self._current_motor_cmd_id[key] == cmd_id
+            ]
+            resolved = [self._motor_futures.pop(key)[1] for key in finished]
+            self._exchange_data_lock.release()
+            for future in resolved:
+                future._resolve(completed)
+
+
+class MotorFuture(concurrent.futures.Future):
+    """Wird erfüllt, sobald ein Motor die mit setDistance() gesetzte Strecke zurückgelegt hat
+
+    Das Ergebnis ist True, wenn die Strecke erreicht wurde, und False, wenn
+    vorher ein neuer Befehl an den Motor geschickt oder die Verbindung zum
+    TXT beendet wurde. Mit add_done_callback() registrierte Funktionen
+    laufen im Thread des Datenaustauschs und sollten daher kurz sein.
+    """
+
+    def wait(self, timeout=None) -> bool:
+        """Wartet, bis der Motor fertig ist
+
+        Args:
+            timeout (float, optional): maximale Wartezeit in Sekunden. Defaults to None.
+
+        Returns:
+            bool: True, wenn die Strecke erreicht wurde, sonst False
+        """
+        try:
+            return self.result(timeout)
+        except (concurrent.futures.TimeoutError, concurrent.futures.CancelledError):
+            return False
+
+    def _resolve(self, value):
+        # the exchange thread and a superseding setDistance() may race
+        try:
+            self.set_result(value)
+        except concurrent.futures.InvalidStateError:
+            pass
+
+    def __await__(self):
+        import asyncio
+
+        return asyncio.wrap_future(self).__await__()
+
+
+def wait_all(futures, timeout=None) -> bool:
+    """Wartet, bis alle Motoren fertig sind
+
+    Args:
+        futures: MotorFuture Objekte, z.B. von setDistance() oder MotorGroup.set_distances()
+        timeout (float, optional): maximale Wartezeit in Sekunden für alle zusammen. Defaults to None.
+
+    Returns:
+        bool: True, wenn alle Motoren ihre Strecke erreicht haben
+    """
+    end = None if timeout is None else time.monotonic() + timeout
+    result = True
+    for future in futures:
+        remaining = None if end is None else max(0, end - time.monotonic())
+        result = future.wait(remaining) and result
+    return result
+
+
+class configBatch(object):
+    def __init__(self, txt):
+        self._txt = txt
+        self._active = False
+        self.extensions = set()
+        self.wait = False
+
+    def __enter__(self):
+        # nested batches are merged into the outermost one
+        if self._txt._config_batch is None:
+            self._txt._config_batch = self
+            self._active = True
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if not self._active:
+            return False
+        self._txt._config_batch = None
+        self._active = False
+        for ext in sorted(self.extensions):
+            self._txt.updateConfig(ext)
+        if self.extensions or self.wait:
+            self._txt.updateWait()
+        return False
 
 
 class ftTXTKeepConnection(threading.Thread):
@@ -1232,18 +1569,19 @@ class ftTXTKeepConnection(threading.Thread):
                 self._txt._keep_running_lock.release()
                 m_time = time.time() - o_time
                 if m_time > self._txt_maxtime:
-                    m_id = 0xDC21219A
-                    m_resp_id = 0xBAC9723E
-                    buf = struct.pack("<I", m_id)
+                    m_resp_id = protocol.QUERY_STATUS_RESP_ID
                     self._txt._keep_running_lock.acquire()
-                    res = self._txt._sock.send(buf)
-                    data = self._txt._sock.recv(512)
+                    res = self._txt._sock.send(protocol.QUERY_STATUS_REQUEST)
+                    data = self._txt._sock.recv(protocol.RECV_SIZE)
                     self._txt._update_timer = time.time()
                     self._txt._keep_running_lock.release()
-                    fstr = "<I16sI"
                     response_id = 0
-                    if len(data) == struct.calcsize(fstr):
-                        response_id, m_devicename, m_version = struct.unpack(fstr, data)
+                    if len(data) == protocol.QUERY_STATUS_RESPONSE.size:
+                        (
+                            response_id,
+                            m_devicename,
+                            m_version,
+                        ) = protocol.QUERY_STATUS_RESPONSE.unpack(data)
                     else:
                         m_devicename = ""
                         m_version = ""
@@ -1260,20 +1598,128 @@ class ftTXTKeepConnection(threading.Thread):
         return
 
 
+class i2cTransaction(object):
+    # collects i2c reads and writes for one device, all requests are sent
+    # pipelined in execute() and cost a single network round trip
+
+    C_READ = protocol.I2C_READ
+    C_WRITE = protocol.I2C_WRITE
+    # bound to the class, so transactions sent from __del__ methods still work
+    # while the interpreter shuts down and clears the protocol module
+    _ID = protocol.I2C_ID
+    _RESP_ID = protocol.I2C_RESP_ID
+    _READ_REQUEST = protocol.I2C_READ_REQUEST
+    _READ_RESPONSE_SIZE = protocol.I2C_READ_RESPONSE_HEAD.size
+    _WRITE_REQUEST = protocol.I2C_WRITE_REQUEST
+    _WRITE_RESPONSE_SIZE = protocol.I2C_WRITE_RESPONSE.size
+    _RESPONSE_ID = protocol.I2C_RESPONSE_ID
+
+    def __init__(self, txt, dev, debug=False):
+        self._txt = txt
+        self._dev = dev
+        self._debug = debug
+        self._requests = []
+        self.results = []
+
+    def read(self, reg, reg_len=1, data_len=1):
+        buf = self._READ_REQUEST.pack(
+            self._ID, self.C_READ, self._dev, reg_len, data_len, reg
+        )
+        length = self._READ_RESPONSE_SIZE + data_len
+        self._requests.append((buf, length, data_len))
+        return len(self._requests) - 1
+
+    def write(self, reg, value):
+        buf = self._WRITE_REQUEST.pack(
+            self._ID, self.C_WRITE, self._dev, 0x02, reg, value
+        )
+        self._requests.append((buf, self._WRITE_RESPONSE_SIZE, None))
+        return len(self._requests) - 1
+
+    def execute(self):
+        m_resp_id = self._RESP_ID
+        self.results = []
+        if not self._requests:
+            return self.results
+        responses = self._txt._i2c_exchange(
+            [r[0] for r in self._requests],
+            [r[1] for r in self._requests],
+            debug=self._debug,
+        )
+        for (buf, length, data_len), data in zip(self._requests, responses):
+            response_id = 0
+            if data is not None:
+                (response_id,) = self._RESPONSE_ID.unpack_from(data)
+            if response_id != m_resp_id:
+                self._txt.handle_error(
+                    "WARNING: ResponseID %s of I2C transaction does not match"
+                    % hex(response_id),
+                    None,
+                )
+                self.results.append(None)
+            elif data_len is None:
+                self.results.append(True)
+            else:
+                self.results.append(data[-data_len:])
+        self._requests = []
+        return self.results
+
+    def __len__(self):
+        return len(self._requests)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        return False
+
+
+def _crc_table():
+    table = []
+    for dividend in range(256):
+        remainder = dividend << 24
+        for bit in range(8, 0, -1):
+            if remainder & 0x80000000:
+                remainder = (remainder << 1) ^ 0x04C11DB7
+            else:
+                remainder = remainder << 1
+        table.append(remainder & 0xFFFFFFFF)
+    return table
+
+
+# CRC-32/MPEG-2 of the compressed exchange: polynomial 0x04C11DB7, MSB first,
+# start value 0xFFFFFFFF, no final xor
+CRC_TABLE = _crc_table()
+
+# zlib computes the bit reflected CRC-32 with the same polynomial, with
+# reflected input and output it yields the MPEG-2 variant
+_REVERSED_BITS = bytes(int("{:08b}".format(i)[::-1], 2) for i in range(256))
+
+
+def _reverse32(value):
+    return int.from_bytes(value.to_bytes(4, "big").translate(_REVERSED_BITS), "little")
+
+
+def crc_words(words, crc=0xFFFFFFFF):
+    """CRC of a sequence of 16 bit words (high byte first), continuing crc"""
+    data = array("H", [word & 0xFFFF for word in words])
+    if sys.byteorder == "little":
+        data.byteswap()
+    data = data.tobytes()
+    if zlib is not None:
+        crc = zlib.crc32(data.translate(_REVERSED_BITS), _reverse32(crc) ^ 0xFFFFFFFF)
+        return _reverse32(crc ^ 0xFFFFFFFF)
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ CRC_TABLE[(crc >> 24) ^ byte]
+    return crc
+
+
 class CRC32(object):
     def __init__(self):
         self.Reset()
-        self.m_table = [0 for i in range(256)]
-        for dividend in range(256):
-            # remainder = (dividend << 24) & 0xffffffff
-            remainder = dividend << 24
-            for bit in range(8, 0, -1):
-                if remainder & 0x80000000:
-                    remainder = (remainder << 1) ^ 0x04C11DB7
-                else:
-                    remainder = remainder << 1
-                # remainder &= 0xffffffff
-            self.m_table[dividend] = remainder & 0xFFFFFFFF
+        self.m_table = CRC_TABLE
         return
 
     def Reset(self):
@@ -1294,16 +1740,27 @@ class CRC32(object):
         self.m_crc &= 0xFFFFFFFF
         return
 
+    def Add16bitWords(self, words):
+        self.c += len(words)
+        self.m_crc = crc_words(words, self.m_crc)
+        return
+
 
 class compBuffer(object):
+    # run length/toggle codec of the compressed exchange. Like the TXT
+    # firmware, m_previous_word is reset to 0 after every word, so every word
+    # is coded relative to 0:
+    # 00 no change, 01 ... run of no changes, 10 toggle, 11 + 16 bit word
+
     def __init__(self):
         self.m_crc = CRC32()
+        self._zero_words = array("H")
         self.Reset()
         return
 
     def Reset(self):
         self.Rewind()
-        self.m_compressed = []
+        self.m_compressed = bytearray()
         self.m_nochange_count = 0
         return
 
@@ -1312,24 +1769,33 @@ class compBuffer(object):
         self.m_bitcount = 0
         self.m_nochange_count = 0
         self.m_previous_word = 0
+        self._cursor = 0
         self.m_crc.Reset()
         return
 
+    @property
+    def m_compressed(self):
+        return self._compressed
+
+    @m_compressed.setter
+    def m_compressed(self, data):
+        # decoding walks through data with a cursor, so a memoryview of the
+        # receive buffer can be passed in without copying it
+        if isinstance(data, str):
+            data = data.encode("latin-1")
+        self._compressed = data
+        self._cursor = 0
+
     def GetBits(self, count):
         # byte      |2 2 2 2 2 2 2 2|1 1 1 1 1 1 1 1|
         # fragment  |7 7|6 6|5 5|4 4 4 4|3 3|2 2|1 1|
         while self.m_bitcount < count:
-            cp = self.m_compressed[0]
-            if isinstance(cp, str):
-                self.m_bitbuffer |= ord(cp) << self.m_bitcount
-            else:
-                self.m_bitbuffer |= cp << self.m_bitcount
-            self.m_compressed = self.m_compressed[1:]
+            self.m_bitbuffer |= self._compressed[self._cursor] << self.m_bitcount
+            self._cursor += 1
             self.m_bitcount += 8
-        res = self.m_bitbuffer & (0xFFFFFFFF >> (32 - count))
+        res = self.m_bitbuffer & ((1 << count) - 1)
         self.m_bitbuffer >>= count
         self.m_bitcount -= count
-        # print("m_bitcount=", self.m_bitcount, " m_bitbuffer=",format(self.m_bitbuffer, '016b'), " m_compressed=",' '.join(format(ord(x),'08b') for x in self.m_compressed))
         return res
 
     def GetWord(self):
@@ -1372,18 +1838,35 @@ class compBuffer(object):
             elif head == 3:
                 word = self.GetBits(16)
         self.m_previous_word = 0
-        # self.m_crc.Add16bit(word)
         return word
 
+    def GetWords(self, out, count=None):
+        # decodes count words (default len(out)) straight into out, runs of
+        # unchanged words are filled in one slice assignment
+        if count is None:
+            count = len(out)
+        if len(self._zero_words) < count:
+            self._zero_words = array("H", bytes(2 * count))
+        i = 0
+        while i < count:
+            if self.m_nochange_count > 0:
+                run = min(self.m_nochange_count, count - i)
+                out[i : i + run] = self._zero_words[:run]
+                self.m_nochange_count -= run
+                i += run
+            else:
+                out[i] = self.GetWord()
+                i += 1
+        return out
+
     def PushBits(self, count, bits):
         self.m_bitbuffer |= bits << self.m_bitcount
         self.m_bitbuffer &= 0xFFFFFFFF
         self.m_bitcount += count
         while self.m_bitcount >= 8:
             self.m_bitcount -= 8
-            self.m_compressed.append(self.m_bitbuffer & 0xFF)
+            self._compressed.append(self.m_bitbuffer & 0xFF)
             self.m_bitbuffer >>= 8
-        # print("m_bitcount=", self.m_bitcount, " m_bitbuffer=",format(self.m_bitbuffer, '016b'), " m_compressed=",' '.join(format(ord(x),'08b') for x in self.m_compressed))
         return
 
     def EncodeNoChangeCount(self):
@@ -1394,37 +1877,27 @@ class compBuffer(object):
         # 01 11 xxxx NoChange 5..19x16 bit
         # 01 11 1111 xxxxxxxx NoChange 20..274 x16 bit
         # 01 11 1111 11111111 xxxxxxxx-xxxxxxxx NoChange 275... bit
+        # the prefixes are pushed together, the bits are in the same order
         while self.m_nochange_count > 0:
             if self.m_nochange_count == 1:
                 self.PushBits(2, 0)
                 break
             elif self.m_nochange_count <= 4:
-                self.PushBits(2, 1)
-                self.PushBits(2, self.m_nochange_count - 2)
+                self.PushBits(4, 1 | (self.m_nochange_count - 2) << 2)
                 break
             elif self.m_nochange_count <= 4 + 15:
-                self.PushBits(2, 1)
-                self.PushBits(2, 3)
-                self.PushBits(4, self.m_nochange_count - 4 - 1)
+                self.PushBits(8, 0x0D | (self.m_nochange_count - 4 - 1) << 4)
                 break
             elif self.m_nochange_count <= 4 + 15 + 255:
-                self.PushBits(2, 1)
-                self.PushBits(2, 3)
-                self.PushBits(4, 15)
+                self.PushBits(8, 0xFD)
                 self.PushBits(8, self.m_nochange_count - 4 - 15 - 1)
                 break
             elif self.m_nochange_count <= 4 + 15 + 255 + 4096:
-                self.PushBits(2, 1)
-                self.PushBits(2, 3)
-                self.PushBits(4, 15)
-                self.PushBits(8, 255)
+                self.PushBits(16, 0xFFFD)
                 self.PushBits(16, self.m_nochange_count - 4 - 15 - 255 - 1)
                 break
             else:
-                self.PushBits(2, 1)
-                self.PushBits(2, 3)
-                self.PushBits(4, 15)
-                self.PushBits(8, 255)
+                self.PushBits(16, 0xFFFD)
                 self.PushBits(16, 4095)
                 self.m_nochange_count += -4 - 15 - 255 - 4096
         self.m_nochange_count = 0
@@ -1447,8 +1920,24 @@ class compBuffer(object):
                 self.PushBits(2, 2)
             else:
                 # 11 16 bit follow immediately
-                self.PushBits(2, 3)
-                self.PushBits(16, word)
+                self.PushBits(18, 3 | (word & 0xFFFF) << 2)
+        self.m_previous_word = 0
+
+    def AddWords(self, words, previous_words):
+        # encodes words relative to previous_words like the exchange thread
+        # did with AddWord: unchanged words are no change, words changed to
+        # 0 or 1 are a toggle and all others are sent as 16 bit word
+        self.m_crc.Add16bitWords(words)
+        for word, previous in zip(words, previous_words):
+            if word == previous:
+                self.m_nochange_count += 1
+                continue
+            if self.m_nochange_count:
+                self.EncodeNoChangeCount()
+            if word == 0 or word == 1:
+                self.PushBits(2, 2)
+            else:
+                self.PushBits(18, 3 | (word & 0xFFFF) << 2)
         self.m_previous_word = 0
 
     def Finish(self):
@@ -1469,7 +1958,8 @@ class ftTXTexchange(threading.Thread):
         self._txt_interval_timer = time.time()
         if self._txt._use_extension:
             self.compBuffer = compBuffer()
-        self._crc0 = 809550095
+        # CRC of a frame without changes, sent together with _cmpbuf0
+        self._crc0 = crc_words([0] * 54)
         self._cmpbuf0 = [253, 34]  # '\xfd"' # chr(253),chr(34)
         self._previous_uncbuf = [0 for i in range(54)]
         self._previous_response = [0 for i in range(84)]
@@ -1477,9 +1967,38 @@ class ftTXTexchange(threading.Thread):
         self._recv_crc0 = 0x628EBB05
         self._recv_crc = self._recv_crc0
         self._prev_recv_crc = self._recv_crc
+        self._recv_buffer = bytearray(protocol.RECV_SIZE)
+        self._response_words = array("H", bytes(2 * 77))
+        self._exchange_codec = protocol.Codec(protocol.EXCHANGE)
+        self._compressed_codec = protocol.Codec(
+            protocol.EXCHANGE_COMPRESSED_HEAD, protocol.RECV_SIZE
+        )
+        self._direct_config_codec = protocol.Codec(protocol.DIRECT_CONFIG_IO)
+        self._direct_exchange_codec = protocol.Codec(protocol.DIRECT_EXCHANGE)
         return
 
+    @staticmethod
+    def _conv_null(a, b) -> List[Any]:
+        # applies a decoded response to the previous values: 0 is no change,
+        # 1 toggles between 0 and 1, everything else is the new value
+        return [
+            a[i]
+            if b[i] == 0
+            else 0
+            if (b[i] == 1 and a[i] == 1)
+            else 1
+            if (b[i] == 1 and a[i] == 0)
+            else b[i]
+            for i in range(len(b))
+        ]
+
     def run(self):
+        try:
+            self._exchange()
+        finally:
+            self._txt._cycle_done(completed=False)
+
+    def _exchange(self):
         while not self._txt_stop_event.is_set():
             if self._txt._directmode:
                 if self._txt_sleep_between_updates > 0:
@@ -1497,14 +2016,6 @@ class ftTXTexchange(threading.Thread):
                     # at first, transfer i/o config data from TXT to motor shield
                     # (this is only necessary, if config data has been changed, e.g. the config_id number has been increased)
                     #
-                    fields = []
-                    fmtstr = "<BBB BBBB H BBBBBB"
-                    # fmtstr = '<' # little endian
-                    fields.append(ftTXT.C_MOT_CMD_CONFIG_IO)
-                    # cycle counter of transmitted and received data have to match (not yet checked here yet !)
-                    fields.append(self._txt._cycle_count)
-                    fields.append(0)  # only master
-                    # fmtstr += 'BBB'
                     inp = [0, 0, 0, 0]
                     for k in range(8):
                         mode = self._txt._ftX1_uni[k * 3]
@@ -1542,48 +2053,24 @@ class ftTXTexchange(threading.Thread):
                             direct_mode = ftTXT.C_MOT_INPUT_ANALOG_VOLTAGE
 
                         inp[int(k / 2)] |= (direct_mode & 0x0F) << (4 * (k % 2))
-                    fields.append(inp[0])
-                    fields.append(inp[1])
-                    fields.append(inp[2])
-                    fields.append(inp[3])
-                    # fmtstr += 'BBBB'
-                    fields.append(0)  # CRC (not used ?)
-                    # fmtstr += 'H'
-                    fields.append(0)
-                    fields.append(0)
-                    fields.append(0)
-                    fields.append(0)
-                    fields.append(0)
-                    fields.append(0)
-                    # fmtstr += 'BBBBBB' # dummy bytes to fill up structure to 15 bytes in total
-                    buflen = struct.calcsize(fmtstr)
-                    buf = struct.pack(fmtstr, *fields)
+                    # cycle counter of transmitted and received data have to match (not yet checked here yet !)
+                    buf = self._direct_config_codec.pack(
+                        ftTXT.C_MOT_CMD_CONFIG_IO,
+                        self._txt._cycle_count,
+                        0,  # only master
+                        *inp,
+                        0,  # CRC (not used ?)
+                        # 6 dummy bytes fill up the structure to 15 bytes in total
+                    )
                     self._txt._ser_ms.write(buf)
                     data = self._txt._ser_ms.read(len(buf))
 
                 #
                 # transfer parameter data from TXT to motor shield
                 #
-                fields = []
-                fmtstr = "<BBBB BBBBBBBB BB BBBB HHHH BBBB BBBBBBBBBBBB H"
-                # fmtstr = '<' # little endian
-                fields.append(ftTXT.C_MOT_CMD_EXCHANGE_DATA)
-                # number of bytes to transfer will be set below
-                fields.append(0)
-                fields.append(self._txt._cycle_count)
-                # bit pattern of connected txt extension modules, 0 = only master
-                fields.append(0)
-                # fmtstr += 'BBBB'
-
                 # pwm data
                 #
-                for k in range(8):
-                    if self._txt._pwm[k] == 512:
-                        pwm = 255
-                    else:
-                        pwm = int(self._txt._pwm[k] / 2)
-                    fields.append(pwm)
-                    # fmtstr += 'B'
+                pwm = [255 if p == 512 else int(p / 2) for p in self._txt._pwm]
 
                 # synchronization data (for encoder motors)
                 #
@@ -1594,9 +2081,6 @@ class ftTXTexchange(threading.Thread):
                 S = self._txt.getMotorSyncMaster()
                 sync_low = (S[0] & 0x0F) | ((S[1] & 0x0F) << 4)
                 sync_high = (S[2] & 0x0F) | ((S[3] & 0x0F) << 4)
-                fields.append(sync_low)
-                fields.append(sync_high)
-                # fmtstr += 'BB'
 
                 # cmd id data
                 #
@@ -1618,47 +2102,34 @@ class ftTXTexchange(threading.Thread):
                 b2 = (M[1] & 0x06) >> 1
                 b2 |= (M[2] & 0x07) << 2
                 b2 |= (M[3] & 0x07) << 5
-                fields.append(b0)
-                fields.append(b1)
-                fields.append(b2)
-                fields.append(0)
-                # fmtstr += 'BBBB'
 
                 # distance counters
                 #
                 D = self._txt.getMotorDistance()
-                fields.append(D[0])  # distance counter 1
-                fields.append(D[1])  # distance counter 2
-                fields.append(D[2])  # distance counter 3
-                fields.append(D[3])  # distance counter 4
-                # fmtstr += 'HHHH'
-
-                # reserve bytes
-                #
-                fields.append(0)
-                fields.append(0)
-                fields.append(0)
-                fields.append(0)
-                # fmtstr += 'BBBB'
 
-                # more filler bytes
-                #
-                # the length of the transmitted data block (from the txt to the motor shield)
+                # 4 reserve bytes and 12 more filler bytes follow, the length
+                # of the transmitted data block (from the txt to the motor shield)
                 # has to be at least as large as the length of the expected data block
                 # (the answer of the motor shield will never be longer than the initial send)
-                for k in range(12):
-                    fields.append(0)
-                    # fmtstr += 'B'
-
-                # crc
                 #
                 # it seems that the crc is not used on the motor shield
-                fields.append(0)
-                # fmtstr += 'H'
-
-                buflen = struct.calcsize(fmtstr)
-                fields[1] = buflen
-                buf = struct.pack(fmtstr, *fields)
+                codec = self._direct_exchange_codec
+                buf = codec.pack(
+                    ftTXT.C_MOT_CMD_EXCHANGE_DATA,
+                    codec.size,  # number of bytes to transfer
+                    self._txt._cycle_count,
+                    # bit pattern of connected txt extension modules, 0 = only master
+                    0,
+                    *pwm,
+                    sync_low,
+                    sync_high,
+                    b0,
+                    b1,
+                    b2,
+                    0,
+                    *D,  # distance counters 1-4
+                    0,  # crc
+                )
                 self._txt._ser_ms.write(buf)
                 data = self._txt._ser_ms.read(len(buf))
                 # the answer of the motor shield has the following format
@@ -1695,10 +2166,8 @@ class ftTXTexchange(threading.Thread):
                 # fmtstr += 'B'    # [37]    reserve byte 1
                 # fmtstr += 'BB'   # [38:39] 2 byte crc (not used)
 
-                fmtstr = "<BBBBB BBBB BBB BBBB BBB BBBBBBB HHHH BBBBBBBB BB"
-
-                if len(data) == struct.calcsize(fmtstr):
-                    response = struct.unpack(fmtstr, data)
+                if len(data) == protocol.DIRECT_EXCHANGE_RESPONSE.size:
+                    response = protocol.DIRECT_EXCHANGE_RESPONSE.unpack(data)
                 else:
                     response = ["i", [0] * len(data)]
 
@@ -1850,7 +2319,7 @@ class ftTXTexchange(threading.Thread):
                 cM[2] = (b2 >> 2) & 0x07
                 cM[3] = (b2 >> 5) & 0x07
 
-                self._txt._update_status = 1
+                self._txt._cycle_done()
                 self._txt._exchange_data_lock.release()
 
                 #
@@ -1924,17 +2393,7 @@ class ftTXTexchange(threading.Thread):
 
                     if self._txt._use_extension:
                         # start_time=time.time()
-                        m_id = 0xFBC56F98
-                        m_resp_id = 0x6F3B54E6
-                        m_extrasize = 0
-                        self._txt._exchange_data_lock.acquire()
-                        fields = [m_id]  # commad id
-                        fields += [m_extrasize]  # will be calculated below
-                        fields += [0]  # CRC, set below
-                        fields += [1]  # number of active extensions
-                        fields += [0]  # 16 bit dummy align
-                        fstr = "<IIIHH"
-                        self._txt._exchange_data_lock.release()
+                        m_resp_id = protocol.EXCHANGE_COMPRESSED_RESP_ID
                         if self._txt._TransferDataChanged:
                             uncbuf = []
                             # add MASTER fields
@@ -1961,46 +2420,42 @@ class ftTXTexchange(threading.Thread):
                                 self._txt._sound_index[1],
                                 self._txt._sound_repeat[1],
                             ]
+                            # cleared under the lock, changes made after the
+                            # snapshot are sent with the next cycle
+                            self._txt._TransferDataChanged = False
                             self._txt._exchange_data_lock.release()
                             # print(uncbuf)
                             # compress buffer
                             self.compBuffer.Reset()
-                            for i in range(len(uncbuf)):
-                                if uncbuf[i] == self._previous_uncbuf[i]:
-                                    self.compBuffer.AddWord(0, word_for_crc=uncbuf[i])
-                                else:
-                                    if uncbuf[i] == 0:
-                                        self.compBuffer.AddWord(1, word_for_crc=0)
-                                    else:
-                                        self.compBuffer.AddWord(uncbuf[i])
+                            self.compBuffer.AddWords(uncbuf, self._previous_uncbuf)
                             self.compBuffer.Finish()
                             self._previous_uncbuf = uncbuf[:]
                             crc = self.compBuffer.m_crc.m_crc & 0xFFFFFFFF
                             cmpbuf = self.compBuffer.m_compressed
-                            self._txt._TransferDataChanged = False
                             self._previous_crc = crc
                         else:
                             crc = self._previous_crc
                             cmpbuf = self._cmpbuf0
 
                         m_extrasize = len(cmpbuf)
-                        fields += cmpbuf
-                        fstr += str(m_extrasize) + "B"
-                        # fields += [0] # dummy byte UINT8
-                        # fstr   += 'B'
-                        fields[1] = m_extrasize
-                        fields[2] = crc
-                        # print("fields=", fields)
-                        # print("crc=",hex(crc)," : ", format((crc >>24) & 255, '3d'), format((crc >>16) & 255, '3d'), format((crc >>8) & 255, '3d'), format(crc & 255, '3d'), "  cmpbuf=", ' '.join(format(x,'3d') for x in cmpbuf) )
-
-                        buf = struct.pack(fstr, *fields)
+                        # head: command id, size of compressed data, CRC,
+                        # number of active extensions, 16 bit dummy align
+                        buf = self._compressed_codec.pack_with(
+                            cmpbuf,
+                            protocol.EXCHANGE_COMPRESSED_ID,
+                            m_extrasize,
+                            crc,
+                            1,
+                            0,
+                        )
                         # print("buf=",' '.join(format(x, '02x') for x in buf))
                         self._txt._socket_lock.acquire()
                         res = self._txt._sock.send(buf)
 
-                        retbuf = self._txt._sock.recv(512)
+                        count = self._txt._sock.recv_into(self._recv_buffer)
                         self._txt._update_timer = time.time()
                         self._txt._socket_lock.release()
+                        retbuf = memoryview(self._recv_buffer)[:count]
 
                         if len(retbuf) == 0:
                             print(
@@ -2012,7 +2467,7 @@ class ftTXTexchange(threading.Thread):
                         # print("retbuf=",','.join(format(ord(x),'4d') for x in retbuf))
                         # head of response is uncompressed
                         self._prev_recv_crc = self._recv_crc  # save previous checksum
-                        resphead = struct.unpack("<IIIHH", retbuf[:16])
+                        resphead = protocol.EXCHANGE_COMPRESSED_HEAD.unpack_from(retbuf)
                         response_id = resphead[0]
                         extra_size = resphead[1]  # size of compressed data
                         # CRC32 checksum of compressed data
@@ -2032,25 +2487,13 @@ class ftTXTexchange(threading.Thread):
                         if self._prev_recv_crc != self._recv_crc:
                             # uncompress body of response
                             self.compBuffer.Reset()
-                            self.compBuffer.m_compressed = retbuf[16:]
-                            response = list(
-                                map(lambda x: self.compBuffer.GetWord(), range(77))
-                            )
+                            self.compBuffer.m_compressed = retbuf[
+                                protocol.EXCHANGE_COMPRESSED_HEAD.size :
+                            ]
+                            response = self.compBuffer.GetWords(self._response_words)
                             # print(self._recv_crc, response)
                             self._txt._exchange_data_lock.acquire()
-
-                            def conv_null(a, b) -> List[Any]:
-                                return [
-                                    a[i]
-                                    if b[i] == 0
-                                    else 0
-                                    if (b[i] == 1 and a[i] == 1)
-                                    else 1
-                                    if (b[i] == 1 and a[i] == 0)
-                                    else b[i]
-                                    for i in range(len(b))
-                                ]
-
+                            conv_null = self._conv_null
                             # MASTER
                             self._txt._current_input[:8] = conv_null(
                                 self._txt._current_input[:8], response[:8]
@@ -2097,39 +2540,38 @@ class ftTXTexchange(threading.Thread):
                             # print("time=",end_time-start_time)
 
                     else:
-                        m_id = 0xCC3597BA
-                        m_resp_id = 0x4EEFAC41
+                        m_resp_id = protocol.EXCHANGE_RESP_ID
                         self._txt._exchange_data_lock.acquire()
-                        fields = [m_id]
-                        fields += self._txt._pwm[:8]
-                        fields += self._txt._motor_sync[:4]
-                        fields += self._txt._motor_dist[:4]
-                        fields += self._txt._motor_cmd_id[:4]
-                        fields += self._txt._counter[:4]
-                        fields += [
+                        buf = self._exchange_codec.pack(
+                            protocol.EXCHANGE_ID,
+                            *self._txt._pwm[:8],
+                            *self._txt._motor_sync[:4],
+                            *self._txt._motor_dist[:4],
+                            *self._txt._motor_cmd_id[:4],
+                            *self._txt._counter[:4],
                             self._txt._sound[0],
                             self._txt._sound_index[0],
                             self._txt._sound_repeat[0],
                             0,
                             0,
-                        ]
+                        )
                         self._txt._exchange_data_lock.release()
-                        buf = struct.pack("<I8h4h4h4h4hHHHbb", *fields)
                         self._txt._socket_lock.acquire()
                         res = self._txt._sock.send(buf)
-                        data = self._txt._sock.recv(512)
+                        count = self._txt._sock.recv_into(self._recv_buffer)
                         self._txt._update_timer = time.time()
                         self._txt._socket_lock.release()
-                        fstr = "<I8h4h4h4h4hH4bB4bB4bB4bB4bBb"
                         response_id = 0
-                        if len(data) == struct.calcsize(fstr):
-                            response = struct.unpack(fstr, data)
+                        if count == protocol.EXCHANGE_RESPONSE.size:
+                            response = protocol.EXCHANGE_RESPONSE.unpack_from(
+                                self._recv_buffer
+                            )
                         else:
                             print(
                                 "Received data size (",
-                                len(data),
+                                count,
                                 ") does not match length of format string (",
-                                struct.calcsize(fstr),
+                                protocol.EXCHANGE_RESPONSE.size,
                                 ")",
                             )
                             print("Connection to TXT aborted")
@@ -2161,9 +2603,6 @@ class ftTXTexchange(threading.Thread):
                     print("Network error ", err)
                     self._txt.handle_error("Network error", err)
                     return
-                self._txt._exchange_data_lock.acquire()
-                self._txt._update_status = 1
-                self._txt._exchange_data_lock.release()
                 # extract values of IR-Remotes
                 irNr = ((self._txt._current_ir[4] >> 2) & 3) + 1
                 # IR-Remote any
@@ -2194,12 +2633,30 @@ class ftTXTexchange(threading.Thread):
                 self._txt._ir_current_dip_switch[irNr] = (
                     self._txt._current_ir[irNr * 5 + 4] >> 2
                 ) & 3
+                self._txt._cycle_done()
         return
 
 
+class CameraFrame(NamedTuple):
+    """Ein Kamerabild mit fortlaufender Nummer und Empfangszeit"""
+
+    seq: int
+    timestamp: float
+    # JPEG data, or the decoded image when taken from a cameraDecoder
+    data: Any
+    # frames received after the requested one that were never handed out
+    dropped: int
+
+
 class camera(threading.Thread):
-    def __init__(self, host, port, lock, stop_event):
+
+    # number of frame buffers, one is written while the latest frame and the
+    # one handed out before stay untouched
+    C_RING_SIZE = 3
+
+    def __init__(self, host, port, lock, stop_event, mode=(320, 240, 15, 0)):
         threading.Thread.__init__(self)
+        self.width, self.height, self.fps, self.powerline = mode
         self._camera_host = host
         self._camera_port = port
         self._camera_stop_event = stop_event
@@ -2209,17 +2666,83 @@ class camera(threading.Thread):
         self._m_frameheight = 0
         self._m_framesizeraw = 0
         self._m_framesizecompressed = 0
-        self._m_framedata = []
+        # frames are received into a ring of reusable buffers, _m_framedata
+        # is the index and size of the latest complete frame or None
+        self._ring = [bytearray() for i in range(self.C_RING_SIZE)]
+        self._ring_index = 0
+        self._m_framedata = None
+        self._m_lastframe = None
+        # every complete frame gets the next sequence number, waiters are
+        # woken through the condition
+        self._frame_condition = threading.Condition(lock)
+        self._frame_seq = 0
+        self._frame_time = 0.0
+        self._taken_seq = 0
+        # throughput, measured from the first to the latest frame
+        self._first_frame_time = None
+        self._received_bytes = 0
+        self._camera_sock = None
         return
 
+    def stop(self):
+
+        # ends run() even while it waits for data from the TXT
+        self._camera_stop_event.set()
+        sock = self._camera_sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def stats(self):
+
+        # frames, bytes and seconds between the first and the latest frame,
+        # the first frame only marks the start
+        with self._frame_condition:
+            if self._frame_seq < 2:
+                return 0, 0, 0.0
+            return (
+                self._frame_seq - 1,
+                self._received_bytes,
+                self._frame_time - self._first_frame_time,
+            )
+
+    def _recv_exact(self, view):
+        # fills view completely, returns False if the connection was closed
+        received = 0
+        size = len(view)
+        while received < size:
+            count = self._camera_sock.recv_into(view[received:])
+            if count == 0:
+                return False
+            received += count
+        return True
+
+    def _next_buffer(self, size):
+        # the next ring buffer that holds neither the latest frame nor the
+        # frame handed out last, grown if the frame does not fit
+        busy = {
+            frame[0] for frame in (self._m_framedata, self._m_lastframe) if frame
+        }
+        index = self._ring_index
+        while index in busy:
+            index = (index + 1) % self.C_RING_SIZE
+        self._ring_index = (index + 1) % self.C_RING_SIZE
+        if len(self._ring[index]) < size:
+            self._ring[index] = bytearray(size)
+        return index
+
     def run(self):
         self._camera_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._camera_sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self._camera_sock.setblocking(True)
-        self._total_bytes_read = 0
+        # connect() is bounded, so a stop request is noticed while the TXT
+        # does not answer yet
+        self._camera_sock.settimeout(0.5)
         camera_ready = False
         fault_count = 0
-        while not camera_ready:
+        while not camera_ready and not self._camera_stop_event.is_set():
             time.sleep(0.02)
             try:
                 self._camera_sock.connect((self._camera_host, self._camera_port))
@@ -2230,73 +2753,225 @@ class camera(threading.Thread):
                 camera_ready = True
                 self._camera_stop_event.set()
                 print("Camera not connected")
+        self._camera_sock.settimeout(None)
         if not self._camera_stop_event.is_set():
             print("Camera connected")
+        m_id = protocol.CAMERA_FRAME_ID
+        head = bytearray(protocol.CAMERA_FRAME_HEAD.size)
+        head_view = memoryview(head)
         while not self._camera_stop_event.is_set():
             try:
-                m_id = 0xBDC2D7A1
-                m_ack_id = 0xADA09FBA
-                fstr = "<Iihhii"
-                # data struct size without jpeg data
-                ds_size = struct.calcsize(fstr)
-                data = self._camera_sock.recv(ds_size)
-                data_size = len(data)
-                if data_size > 0:
-                    self._total_bytes_read += data_size
-                    if self._total_bytes_read == ds_size:
-                        response = struct.unpack(fstr, data)
-                        if response[0] != m_id:
-                            print(
-                                "WARNING: ResponseID ",
-                                hex(response[0]),
-                                " of cameraOnlineFrame command does not match",
-                            )
-                        self._m_numframesready = response[1]
-                        self._m_framewidth = response[2]
-                        self._m_frameheight = response[3]
-                        self._m_framesizeraw = response[4]
-                        self._m_framesizecompressed = response[5]
-                        self._m_framedata = []
-                        m_framedata_part = []
-                        fdatacount = 0
-                        while (
-                            len(data) > 0
-                            and self._total_bytes_read
-                            < ds_size + self._m_framesizecompressed
-                        ):
-                            data = self._camera_sock.recv(1500)
-                            m_framedata_part[fdatacount:] = data[:]
-                            fdatacount += len(data)
-                            self._total_bytes_read += len(data)
-                        self._camera_data_lock.acquire()
-                        self._m_framedata[:] = m_framedata_part[:]
-                        self._camera_data_lock.release()
-                        if len(data) == 0:
-                            print("WARNING: Connection to camera lost")
-                            self._camera_stop_event.set()
-                        if (
-                            self._total_bytes_read
-                            == ds_size + self._m_framesizecompressed
-                        ):
-                            buf = struct.pack("<I", m_ack_id)
-                            res = self._camera_sock.send(buf)
-                        self._total_bytes_read = 0
-                else:
+                if not self._recv_exact(head_view):
+                    self._camera_stop_event.set()
+                    break
+                response = protocol.CAMERA_FRAME_HEAD.unpack(head)
+                if response[0] != m_id:
+                    print(
+                        "WARNING: ResponseID ",
+                        hex(response[0]),
+                        " of cameraOnlineFrame command does not match",
+                    )
+                self._m_numframesready = response[1]
+                self._m_framewidth = response[2]
+                self._m_frameheight = response[3]
+                self._m_framesizeraw = response[4]
+                self._m_framesizecompressed = size = response[5]
+                self._camera_data_lock.acquire()
+                index = self._next_buffer(size)
+                self._camera_data_lock.release()
+                if not self._recv_exact(memoryview(self._ring[index])[:size]):
+                    print("WARNING: Connection to camera lost")
                     self._camera_stop_event.set()
+                    break
+                with self._frame_condition:
+                    self._m_framedata = (index, size)
+                    self._frame_seq += 1
+                    self._frame_time = time.time()
+                    if self._first_frame_time is None:
+                        self._first_frame_time = self._frame_time
+                    else:
+                        self._received_bytes += len(head) + size
+                    self._frame_condition.notify_all()
+                self._camera_sock.send(protocol.CAMERA_ACK_REQUEST)
             except Exception as err:
                 print("ERROR in camera thread: ", err)
-                self._camera_sock.close()
-                return
+                break
         self._camera_sock.close()
+        self._camera_stop_event.set()
+        with self._frame_condition:
+            self._frame_condition.notify_all()
         return
 
-    def getCameraFrame(self):
+    def _wait_frame(self, after_seq, timeout):
+
+        # caller holds _frame_condition, returns the seq and view of the
+        # latest frame if it is newer than after_seq, otherwise None
+        # only callers without after_seq take frames away from each other
+        default = after_seq is None
+        if default:
+            after_seq = self._taken_seq
+        self._frame_condition.wait_for(
+            lambda: self._frame_seq > after_seq or self._camera_stop_event.is_set(),
+            timeout,
+        )
+        if self._frame_seq <= after_seq:
+            return None
+        if default:
+            self._taken_seq = self._frame_seq
+        index, size = self._m_framedata
+        return after_seq, memoryview(self._ring[index])[:size]
+
+    def get_frame(self, after_seq=None, timeout=None):
+
+        # waits for a frame newer than after_seq (default: the frame taken
+        # last) and returns it as CameraFrame, or None on timeout
+        with self._frame_condition:
+            found = self._wait_frame(after_seq, timeout)
+            if found is None:
+                return None
+            after_seq, view = found
+            return CameraFrame(
+                self._frame_seq,
+                self._frame_time,
+                bytes(view),
+                max(0, self._frame_seq - after_seq - 1),
+            )
+
+    def getCameraFrameView(self, timeout=None):
+
+        # like get_frame, but returns only the data as memoryview into the
+        # ring without copying. The view stays valid until the next frame is
+        # taken, the camera thread never writes into it before.
+        with self._frame_condition:
+            found = self._wait_frame(None, timeout)
+            if found is None:
+                return None
+            self._m_lastframe = self._m_framedata
+            return found[1]
+
+    def getCameraFrame(self, timeout=None):
+
+        frame = self.get_frame(timeout=timeout)
+        if frame is None:
+            return None
+        return frame.data
+
+
+def _imaging():
+
+    # Pillow and numpy are optional and only imported when a decoder starts,
+    # so they do not slow down the import of ftrobopy
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    return Image, numpy
 
-        self._camera_data_lock.acquire()
-        data = self._m_framedata
-        self._m_framedata = []
-        self._camera_data_lock.release()
-        return data
+
+class cameraDecoder(threading.Thread):
+
+    # decodes the camera frames of a TXT in the background and keeps only the
+    # latest result, so the control loop never waits for JPEG decoding.
+    # Without Pillow the frames are passed on as raw JPEG bytes.
+
+    def __init__(self, txt, grayscale=False, scale=1):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self._txt = txt
+        self._grayscale = grayscale
+        self._scale = scale
+        self._image, self._numpy = _imaging()
+        self._stop_event = threading.Event()
+        self._condition = threading.Condition(threading.Lock())
+        self._latest = None
+        self._seq = 0
+        self._taken_seq = 0
+        self.decoded = 0
+        self.failed = 0
+        self.decode_time = 0.0
+
+    @property
+    def decoding(self):
+        return self._image is not None
+
+    def stop(self):
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+
+    def decode(self, data):
+
+        if self._image is None:
+            return data
+        image = self._image.open(io.BytesIO(data))
+        mode = "L" if self._grayscale else "RGB"
+        size = (
+            max(1, image.width // self._scale),
+            max(1, image.height // self._scale),
+        )
+        # draft lets the JPEG decoder scale by 1/2, 1/4 or 1/8 while decoding
+        image.draft(mode, size)
+        image = image.convert(mode)
+        if image.size != size:
+            image = image.resize(size)
+        if self._numpy is None:
+            return image
+        return self._numpy.asarray(image)
+
+    def run(self):
+        source = None
+        after_seq = 0
+        while not self._stop_event.is_set():
+            thread = self._txt._camera_thread
+            if thread is None:
+                self._stop_event.wait(0.05)
+                continue
+            if thread is not source:
+                # a new camera thread counts its frames from 1 again
+                source = thread
+                after_seq = 0
+            frame = thread.get_frame(after_seq, 0.2)
+            if frame is None:
+                if not thread.is_alive():
+                    self._stop_event.wait(0.05)
+                continue
+            after_seq = frame.seq
+            start = time.perf_counter()
+            try:
+                image = self.decode(frame.data)
+            except Exception as err:
+                if not self.failed:
+                    print("WARNING: camera frame could not be decoded:", err)
+                self.failed += 1
+                continue
+            self.decode_time += time.perf_counter() - start
+            self.decoded += 1
+            with self._condition:
+                # dropped counts the frames the decoder was too slow for
+                self._seq += 1
+                self._latest = CameraFrame(
+                    self._seq, frame.timestamp, image, frame.dropped
+                )
+                self._condition.notify_all()
+
+    def get(self, wait=False, timeout=None):
+
+        # returns the latest decoded frame, with wait=True only a frame that
+        # has not been returned before
+        with self._condition:
+            if wait:
+                self._condition.wait_for(
+                    lambda: self._seq > self._taken_seq or self._stop_event.is_set(),
+                    timeout,
+                )
+                if self._seq <= self._taken_seq:
+                    return None
+            self._taken_seq = self._seq
+            return self._latest
 
 
 class BTJoystickEval(threading.Thread):
@@ -2331,6 +3006,72 @@ class BTJoystickEval(threading.Thread):
             self._txt._bt_joystick_lock.release()
 
 
+HOST_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".ftrobopy_host")
+
+
+def read_host_cache(path=HOST_CACHE_FILE):
+
+    # returns the host of the last successful auto connection or None
+    try:
+        with open(path) as f:
+            host = f.read().strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+    return host or None
+
+
+def write_host_cache(host, path=HOST_CACHE_FILE):
+
+    try:
+        with open(path, "w") as f:
+            f.write(host + "\n")
+    except OSError:
+        pass
+
+
+def probe_hosts(hosts, port=65000, timeout=0.5):
+
+    # opens non-blocking connections to all hosts at once and returns the
+    # first host that accepts, or None if none answers within timeout. If
+    # several hosts answer at the same time, the earlier one in hosts wins.
+    order = {}
+    sel = selectors.DefaultSelector()
+    try:
+        for host in hosts:
+            if host in order:
+                continue
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.setblocking(False)
+            try:
+                err = s.connect_ex((host, port))
+            except (OSError, UnicodeError):
+                s.close()
+                continue
+            if err not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+                s.close()
+                continue
+            order[host] = len(order)
+            sel.register(s, selectors.EVENT_WRITE, host)
+        end = time.monotonic() + timeout
+        while sel.get_map():
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return None
+            found = []
+            for key, _ in sel.select(remaining):
+                sel.unregister(key.fileobj)
+                if key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                    found.append(key.data)
+                key.fileobj.close()
+            if found:
+                return min(found, key=order.get)
+        return None
+    finally:
+        for key in list(sel.get_map().values()):
+            key.fileobj.close()
+        sel.close()
+
+
 class ftrobopy(ftTXT):
     def __init__(
         self,
@@ -2383,15 +3124,22 @@ class ftrobopy(ftTXT):
             # not running on TXT-controller, check standard ports (only in auto mode)
             else:
                 if host[:4] == "auto":
-                    if probe_socket("192.168.7.2"):  # USB (Ethernet)
-                        host = "192.168.7.2"
-                    elif probe_socket("192.168.8.2"):  # WLAN
-                        host = "192.168.8.2"
-                    elif probe_socket("192.168.9.2"):  # Blutooth
-                        host = "192.168.9.2"
-                    # non standard port, e.g. home network
-                    elif probe_socket(special_connection):
-                        host = special_connection
+                    # all candidates are probed at the same time, the host
+                    # found last time comes first and wins a tie
+                    cached = read_host_cache()
+                    candidates = [
+                        "192.168.7.2",  # USB (Ethernet)
+                        "192.168.8.2",  # WLAN
+                        "192.168.9.2",  # Blutooth
+                        special_connection,  # non standard port, e.g. home network
+                    ]
+                    if cached is not None:
+                        candidates.insert(0, cached)
+                    found = probe_hosts(candidates, port)
+                    if found is not None:
+                        host = found
+                        if found != cached:
+                            write_host_cache(found)
                     else:
                         print("Verbindung zu TXT-Controller fehlgeschlagen. Überprüfe ob dein Computer vollständig verbunden und der TXT-Controller eingeschalten ist.")
                         sys.exit()
@@ -2497,11 +3245,15 @@ class ftrobopy(ftTXT):
                 """
                 if not (-8 <= speed <= 8):
                     raise UserValueError
+                self._outer._exchange_data_lock.acquire()
+                self._apply_speed(speed)
+                self._outer._exchange_data_lock.release()
 
+            def _apply_speed(self, speed):
+                # caller holds _exchange_data_lock
                 c_speed = int(200 / 8 * int(speed) + 312)
                 if c_speed == self._speed:
                     return
-                self._outer._exchange_data_lock.acquire()
                 if speed == 0:
                     self._speed = 0
                 else:
@@ -2514,9 +3266,17 @@ class ftrobopy(ftTXT):
                     self._outer.setPwm(
                         (self._output - 1) * 2 + 1, -self._speed, self._ext
                     )
-                self._outer._exchange_data_lock.release()
 
             def setDistance(self, distance, syncto=None):
+                """Lässt den Motor eine bestimmte Strecke fahren
+
+                Args:
+                    distance (int): Anzahl der Impulse
+                    syncto (mot, optional): Motor, der synchron mitläuft. Defaults to None.
+
+                Returns:
+                    MotorFuture: wird erfüllt, sobald der Motor die Strecke zurückgelegt hat
+                """
                 self._outer._exchange_data_lock.acquire()
                 if syncto:
                     self._distance = distance
@@ -2539,6 +3299,9 @@ class ftrobopy(ftTXT):
                     )
                     self._outer.incrMotorCmdId(self._output - 1, self._ext)
                     self._outer.incrMotorCmdId(syncto._output - 1, self._ext)
+                    syncto._future = syncto._outer._watchMotorCmdId(
+                        syncto._output - 1, self._ext
+                    )
                 else:
                     self._distance = distance
                     self._command_id = self._outer.getCurrentMotorCmdId(
@@ -2547,7 +3310,11 @@ class ftrobopy(ftTXT):
                     self._outer.setMotorDistance(self._output - 1, distance, self._ext)
                     self._outer.setMotorSyncMaster(self._output - 1, 0, self._ext)
                     self._outer.incrMotorCmdId(self._output - 1, self._ext)
+                self._future = self._outer._watchMotorCmdId(
+                    self._output - 1, self._ext
+                )
                 self._outer._exchange_data_lock.release()
+                return self._future
 
             def finished(self):
                 if self._outer.getMotorCmdId(
@@ -2818,6 +3585,37 @@ class ftrobopy(ftTXT):
             self.updateWait()
         return inp(self, num, ext)
 
+    @error_handler
+    def configureDevices(self, devices):
+        """Erzeugt mehrere Motoren, Lampen und Sensoren auf einmal
+
+        Die Konfiguration wird dabei nur einmal an den TXT-Controller gesendet.
+
+        Args:
+            devices (dict): Name und (Art, Anschlussnummer) je Gerät, z.B. {"links": ("motor", 1), "taster": ("button", 3)}. Mögliche Arten sind "motor", "led", "button", "trailfollower", "resistor", "ultrasonic", "voltage" und "colorsensor"
+
+        Returns:
+            dict: Name und Objekt je Gerät
+        """
+        kinds = (
+            "motor",
+            "led",
+            "button",
+            "trailfollower",
+            "resistor",
+            "ultrasonic",
+            "voltage",
+            "colorsensor",
+        )
+        for kind, *args in devices.values():
+            if kind not in kinds:
+                raise UserValueError
+        with self.configure():
+            return {
+                name: getattr(self, kind)(*args)
+                for name, (kind, *args) in devices.items()
+            }
+
     def joystick(self, joynum, remote_number=0, remote_type=0):
         class remote(object):
             def __init__(
@@ -3050,3 +3848,112 @@ class ftrobopy(ftTXT):
         self.setSoundIndex(0, ext)
         self.setSoundRepeat(1, ext)
         self.incrSoundCmdId(ext)
+
+
+class MotorGroup(object):
+    """Fasst mehrere Motoren zusammen, die immer gleichzeitig angesteuert werden
+
+    Alle Werte einer Gruppe werden im selben Datenaustausch an den TXT
+    geschickt, so dass z.B. die vier Motoren eines Mecanum-Fahrwerks genau
+    gleichzeitig anlaufen und anhalten.
+    """
+
+    @error_handler
+    def __init__(self, *motors):
+        """Erzeugt neue Motorgruppe
+
+        Args:
+            *motors: Motoren, die mit txt.motor() erzeugt wurden (alle vom selben TXT)
+        """
+        if len(motors) == 1 and isinstance(motors[0], (list, tuple)):
+            motors = tuple(motors[0])
+        if not motors:
+            raise UserValueError
+        for m in motors:
+            if not hasattr(m, "_apply_speed") or m._outer is not motors[0]._outer:
+                raise UserValueError
+        self._motors = tuple(motors)
+        self._outer = motors[0]._outer
+
+    def _values(self, values):
+        # a single value is used for all motors of the group
+        if isinstance(values, int):
+            return [values] * len(self._motors)
+        values = list(values)
+        if len(values) != len(self._motors):
+            raise UserValueError
+        for v in values:
+            if not isinstance(v, int):
+                raise UserValueError
+        return values
+
+    @error_handler
+    def set_speeds(self, speeds):
+        """Setzt die Drehgeschwindigkeit aller Motoren gleichzeitig
+
+        Args:
+            speeds (list | int): Zahl zwischen -8 und 8 je Motor oder eine Zahl für alle
+        """
+        speeds = self._values(speeds)
+        for speed in speeds:
+            if not (-8 <= speed <= 8):
+                raise UserValueError
+        self._outer._exchange_data_lock.acquire()
+        try:
+            for m, speed in zip(self._motors, speeds):
+                m._apply_speed(speed)
+        finally:
+            self._outer._exchange_data_lock.release()
+
+    @error_handler
+    def set_distances(self, distances):
+        """Setzt die Anzahl der Umdrehungen aller Motoren gleichzeitig
+
+        Args:
+            distances (list | int): Impulse je Motor oder eine Zahl für alle
+
+        Returns:
+            List[MotorFuture]: je Motor, z.B. für wait_all()
+        """
+        distances = self._values(distances)
+        self._outer._exchange_data_lock.acquire()
+        try:
+            return [
+                m.setDistance(distance) for m, distance in zip(self._motors, distances)
+            ]
+        finally:
+            self._outer._exchange_data_lock.release()
+
+    @error_handler
+    def stop_all(self):
+        """Stoppt alle Motoren der Gruppe gleichzeitig"""
+        self._outer._exchange_data_lock.acquire()
+        try:
+            for m in self._motors:
+                m._apply_speed(0)
+                m.setDistance(0)
+        finally:
+            self._outer._exchange_data_lock.release()
+
+    @error_handler
+    def finished(self) -> bool:
+        """Gibt zurück, ob alle Motoren ihre Strecke zurückgelegt haben"""
+        return all(m.finished() for m in self._motors)
+
+    @error_handler
+    def wait(self, timeout=None) -> bool:
+        """Wartet, bis alle Motoren ihre Strecke zurückgelegt haben
+
+        Args:
+            timeout (float, optional): maximale Wartezeit in Sekunden. Defaults to None.
+
+        Returns:
+            bool: True, wenn alle Motoren ihre Strecke erreicht haben
+        """
+        return wait_all([m._future for m in self._motors], timeout)
+
+    def __len__(self):
+        return len(self._motors)
+
+    def __iter__(self):
+        return iter(self._motors)
@@ -0,0 +1,106 @@
+"""
+Wire format of the TXT controller commands
+
+All formats are compiled once at import time. Codec keeps a preallocated
+buffer per command, so sending a command does not allocate a new bytes
+object on every call.
+"""
+
+import struct
+
+# command and response ids
+QUERY_STATUS_ID = 0xDC21219A
+QUERY_STATUS_RESP_ID = 0xBAC9723E
+START_ONLINE_ID = 0x163FF61D
+START_ONLINE_RESP_ID = 0xCA689F75
+STOP_ONLINE_ID = 0x9BE5082C
+STOP_ONLINE_RESP_ID = 0xFBF600D2
+UPDATE_CONFIG_ID = 0x060EF27E
+UPDATE_CONFIG_RESP_ID = 0x9689A68C
+EXCHANGE_ID = 0xCC3597BA
+EXCHANGE_RESP_ID = 0x4EEFAC41
+EXCHANGE_COMPRESSED_ID = 0xFBC56F98
+EXCHANGE_COMPRESSED_RESP_ID = 0x6F3B54E6
+START_CAMERA_ID = 0x882A40A6
+START_CAMERA_RESP_ID = 0xCF41B24E
+STOP_CAMERA_ID = 0x17C31F2F
+STOP_CAMERA_RESP_ID = 0x4B3C1EB6
+CAMERA_FRAME_ID = 0xBDC2D7A1
+CAMERA_ACK_ID = 0xADA09FBA
+I2C_ID = 0xB9DB3B39
+I2C_RESP_ID = 0x87FD0D90
+I2C_READ = 0x01
+I2C_WRITE = 0x02
+
+# main channel
+COMMAND = struct.Struct("<I")
+RESPONSE = struct.Struct("<I")
+QUERY_STATUS_RESPONSE = struct.Struct("<I16sI")
+START_ONLINE = struct.Struct("<I64s")
+UPDATE_CONFIG = struct.Struct(
+    "<Ihh B B 2s BBBB BB2s BB2s BB2s BB2s BB2s BB2s BB2s BB2s B3s B3s B3s B3s 16h"
+)
+EXCHANGE = struct.Struct("<I8h4h4h4h4hHHHbb")
+EXCHANGE_RESPONSE = struct.Struct("<I8h4h4h4h4hH4bB4bB4bB4bB4bBb")
+# head of compressed exchange request and response, the compressed data
+# follows directly after it
+EXCHANGE_COMPRESSED_HEAD = struct.Struct("<IIIHH")
+START_CAMERA = struct.Struct("<I4i")
+
+# camera channel
+CAMERA_FRAME_HEAD = struct.Struct("<Iihhii")
+CAMERA_ACK = struct.Struct("<I")
+
+# i2c channel
+I2C_READ_REQUEST = struct.Struct(">IBIIHH")
+I2C_READ_RESPONSE_HEAD = struct.Struct(">IBIHB")
+I2C_WRITE_REQUEST = struct.Struct(">IBIIIB")
+I2C_WRITE_BYTES_HEAD = struct.Struct(">IBIIBBB")
+I2C_WRITE_RESPONSE = struct.Struct(">III")
+I2C_RESPONSE_ID = struct.Struct(">I")
+
+# motor shield of the direct mode (serial line), every request is at least as
+# long as the response because the shield never answers with more bytes
+DIRECT_CONFIG_IO = struct.Struct("<BBB BBBB H 6x")
+DIRECT_EXCHANGE = struct.Struct("<BBBB 8B BB BBBB HHHH 4x 12x H")
+DIRECT_EXCHANGE_RESPONSE = struct.Struct(
+    "<BBBBB BBBB BBB BBBB BBB BBBBBBB HHHH BBBBBBBB BB"
+)
+
+# requests without arguments never change
+QUERY_STATUS_REQUEST = COMMAND.pack(QUERY_STATUS_ID)
+START_ONLINE_REQUEST = START_ONLINE.pack(START_ONLINE_ID, b"")
+STOP_ONLINE_REQUEST = COMMAND.pack(STOP_ONLINE_ID)
+STOP_CAMERA_REQUEST = COMMAND.pack(STOP_CAMERA_ID)
+CAMERA_ACK_REQUEST = CAMERA_ACK.pack(CAMERA_ACK_ID)
+
+# size of the receive buffers, every recv reads at most this many bytes
+RECV_SIZE = 512
+
+
+class Codec(object):
+    # a precompiled format together with a reusable send buffer, the buffer
+    # is overwritten by the next pack() so callers have to send it first
+
+    __slots__ = ("struct", "buffer", "size")
+
+    def __init__(self, fmt, extra=0):
+        self.struct = fmt if isinstance(fmt, struct.Struct) else struct.Struct(fmt)
+        self.size = self.struct.size
+        self.buffer = bytearray(self.size + extra)
+
+    def pack(self, *values):
+        self.struct.pack_into(self.buffer, 0, *values)
+        return memoryview(self.buffer)[: self.size]
+
+    def pack_with(self, payload, *values):
+        # packs the head and copies payload directly behind it
+        end = self.size + len(payload)
+        if end > len(self.buffer):
+            self.buffer = bytearray(end)
+        self.struct.pack_into(self.buffer, 0, *values)
+        self.buffer[self.size : end] = payload
+        return memoryview(self.buffer)[:end]
+
+    def unpack(self, data, offset=0):
+        return self.struct.unpack_from(data, offset)
@@ -0,0 +1,288 @@
+from array import array
+from functools import lru_cache
+from typing import Any, List, Optional, Sequence, Tuple
+
+GESTURES = ("NONE", "UP", "DOWN", "LEFT", "RIGHT")
+
+# a gesture dataset is a 32x4 uint8 block in fifo order (up, down, left, right)
+DATASETS = 32
+CHANNELS = 4
+BLOCK_SIZE = DATASETS * CHANNELS
+
+_WORD = "I" if array("I").itemsize == 4 else "L"
+_VALID = 0x01010101
+
+
+def _numpy():
+    # numpy is optional and only imported for batch evaluation, so it does
+    # not slow down the import of the package
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class GestureState:
+    """Zwischenstand der Gestenauswertung über mehrere Blöcke hinweg"""
+
+    __slots__ = (
+        "ud_delta",
+        "lr_delta",
+        "ud_count",
+        "lr_count",
+        "near_count",
+        "far_count",
+        "state",
+        "gesmotion",
+    )
+
+    def __init__(self):
+        self.ud_delta = 0
+        self.lr_delta = 0
+        self.ud_count = 0
+        self.lr_count = 0
+        self.near_count = 0
+        self.far_count = 0
+        self.state = 0
+        self.gesmotion = "NONE"
+
+
+@lru_cache(maxsize=16)
+def _threshold_table(threshold: int) -> bytes:
+    return bytes(1 if v > threshold else 0 for v in range(256))
+
+
+def _valid_words(block, total: int, threshold: int) -> array:
+    # every dataset becomes one 32 bit word, which equals _VALID exactly when
+    # all four channels lie above the threshold
+    mask = bytes(block[: CHANNELS * total]).translate(_threshold_table(threshold))
+    words = array(_WORD)
+    words.frombytes(mask)
+    return words
+
+
+def first_last(
+    block, total: int, threshold: int
+) -> Optional[Tuple[Tuple[int, ...], Tuple[int, ...]]]:
+    """Sucht den ersten und letzten Datensatz, dessen Kanäle alle über dem Schwellwert liegen
+
+    Args:
+        block: 32x4 Block mit Gestendaten (bytes, bytearray oder memoryview)
+        total (int): Anzahl gültiger Datensätze im Block
+        threshold (int): Schwellwert
+
+    Returns:
+        Tuple: erster und letzter Datensatz oder None
+    """
+    if not 0 < total <= DATASETS:
+        return None
+    words = _valid_words(block, total, threshold)
+    try:
+        first = words.index(_VALID)
+        # the last dataset is searched down to index 1 only, like the
+        # original sparkfun driver does
+        last = total - 1 - words[:0:-1].index(_VALID)
+    except ValueError:
+        return None
+    f = CHANNELS * first
+    l = CHANNELS * last
+    return tuple(block[f : f + CHANNELS]), tuple(block[l : l + CHANNELS])
+
+
+def chunk_deltas(block, total: int, threshold: int) -> Optional[Tuple[float, float]]:
+    """Berechnet die Änderung der Hoch/Runter- und Links/Rechts-Verhältnisse eines Blocks
+
+    Returns:
+        Tuple[float, float]: ud_delta und lr_delta oder None
+    """
+    if total <= 4:
+        return None
+    found = first_last(block, total, threshold)
+    if found is None:
+        return None
+    (u_f, d_f, l_f, r_f), (u_l, d_l, l_l, r_l) = found
+    try:
+        ud_ratio_first = ((u_f - d_f) * 100) / (u_f + d_f)
+        lr_ratio_first = ((l_f - r_f) * 100) / (l_f + r_f)
+        ud_ratio_last = ((u_l - d_l) * 100) / (u_l + d_l)
+        lr_ratio_last = ((l_l - r_l) * 100) / (l_l + r_l)
+    except ZeroDivisionError:
+        return None
+    return ud_ratio_last - ud_ratio_first, lr_ratio_last - lr_ratio_first
+
+
+def batch_deltas(
+    blocks: Sequence, totals: Optional[Sequence[int]] = None, threshold: int = 10
+) -> Tuple[Sequence[float], Sequence[float], Sequence[bool]]:
+    """Berechnet chunk_deltas für viele Blöcke auf einmal
+
+    Ist numpy installiert, werden alle Blöcke gemeinsam berechnet.
+
+    Args:
+        blocks: N Blöcke mit je 32x4 Bytes (oder ein numpy-Array der Form (N, 32, 4))
+        totals (optional): Anzahl gültiger Datensätze je Block. Defaults to 32.
+        threshold (int, optional): Schwellwert. Defaults to 10.
+
+    Returns:
+        Tuple: ud_delta, lr_delta und ob der Block auswertbar war, jeweils je Block
+    """
+    numpy = _numpy()
+    if numpy is not None:
+        return _batch_deltas_numpy(numpy, blocks, totals, threshold)
+    ud, lr, found = [], [], []
+    for i, block in enumerate(blocks):
+        total = DATASETS if totals is None else totals[i]
+        deltas = chunk_deltas(block, total, threshold)
+        ud.append(0 if deltas is None else deltas[0])
+        lr.append(0 if deltas is None else deltas[1])
+        found.append(deltas is not None)
+    return ud, lr, found
+
+
+def _batch_deltas_numpy(numpy, blocks, totals, threshold):
+    if len(blocks) and isinstance(blocks[0], (bytes, bytearray, memoryview)):
+        data = numpy.frombuffer(b"".join(blocks), dtype=numpy.uint8)
+    else:
+        data = numpy.asarray(blocks, dtype=numpy.uint8)
+    data = data.reshape(-1, DATASETS, CHANNELS)
+    n = len(data)
+    if totals is None:
+        totals = numpy.full(n, DATASETS)
+    else:
+        totals = numpy.asarray(totals)
+    index = numpy.arange(DATASETS)
+    valid = (data > threshold).all(axis=2) & (index < totals[:, None])
+    valid_last = valid & (index >= 1)
+    found = valid.any(axis=1) & valid_last.any(axis=1) & (totals > 4)
+    found &= totals <= DATASETS
+    first = valid.argmax(axis=1)
+    last = DATASETS - 1 - valid_last[:, ::-1].argmax(axis=1)
+    rows = numpy.arange(n)
+    f = data[rows, first].astype(numpy.float64)
+    l = data[rows, last].astype(numpy.float64)
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        ud_first = (f[:, 0] - f[:, 1]) * 100 / (f[:, 0] + f[:, 1])
+        lr_first = (f[:, 2] - f[:, 3]) * 100 / (f[:, 2] + f[:, 3])
+        ud_last = (l[:, 0] - l[:, 1]) * 100 / (l[:, 0] + l[:, 1])
+        lr_last = (l[:, 2] - l[:, 3]) * 100 / (l[:, 2] + l[:, 3])
+    ud_delta = ud_last - ud_first
+    lr_delta = lr_last - lr_first
+    found &= numpy.isfinite(ud_delta) & numpy.isfinite(lr_delta)
+    ud_delta[~found] = 0
+    lr_delta[~found] = 0
+    return ud_delta, lr_delta, found
+
+
+def accumulate(
+    state: Any, ud_delta: float, lr_delta: float, sens1: float, sens2: float
+) -> bool:
+    # updates the running counters of state (an Apds or a GestureState) with
+    # the deltas of one block, returns True if a near/far motion was detected
+    state.ud_delta += ud_delta
+    state.lr_delta += lr_delta
+    if state.ud_delta >= sens1:
+        state.ud_count = 1
+    elif state.ud_delta <= -sens1:
+        state.ud_count = -1
+    else:
+        state.ud_count = 0
+    if state.lr_delta >= sens1:
+        state.lr_count = 1
+    elif state.lr_delta <= -sens1:
+        state.lr_count = -1
+    else:
+        state.lr_count = 0
+    if state.ud_count == 0 and state.lr_count == 0:
+        if abs(ud_delta) < sens2 and abs(lr_delta) < sens2:
+            if ud_delta == 0 and lr_delta == 0:
+                state.near_count += 1
+            elif ud_delta != 0 or lr_delta != 0:
+                state.far_count += 1
+            if state.near_count >= 10 and state.far_count >= 2:
+                if ud_delta == 0 and lr_delta == 0:
+                    state.state = "near"
+                elif ud_delta != 0 and lr_delta != 0:
+                    state.state = "far"
+                return True
+    else:
+        if abs(ud_delta) < sens2 and abs(lr_delta) < sens2:
+            if ud_delta == 0 and lr_delta == 0:
+                state.near_count += 1
+            if state.near_count >= 10:
+                state.ud_count = 0
+                state.lr_count = 0
+                state.ud_delta = 0
+                state.lr_delta = 0
+    return False
+
+
+def decode(ud_count: int, lr_count: int, ud_delta: float, lr_delta: float) -> str:
+    """Bestimmt die Geste aus den Zählern und Änderungen der beiden Achsen
+
+    Returns:
+        str: mögliche Gesten sind ["NONE", "UP", "DOWN", "LEFT", "RIGHT"]
+    """
+    vertical = "UP" if ud_count == -1 else "DOWN"
+    horizontal = "RIGHT" if lr_count == 1 else "LEFT"
+    if ud_count != 0 and lr_count != 0:
+        return vertical if abs(ud_delta) > abs(lr_delta) else horizontal
+    elif ud_count != 0:
+        return vertical
+    elif lr_count != 0:
+        return horizontal
+    return "NONE"
+
+
+def decode_into(state: Any) -> bool:
+    motion = decode(state.ud_count, state.lr_count, state.ud_delta, state.lr_delta)
+    if motion == "NONE":
+        return False
+    state.gesmotion = motion
+    return True
+
+
+def classify(
+    blocks: Sequence,
+    totals: Optional[Sequence[int]] = None,
+    gesture_ids: Optional[Sequence[Any]] = None,
+    threshold: int = 10,
+    sens1: float = 15,
+    sens2: float = 50,
+) -> List[str]:
+    """Klassifiziert viele aufgezeichnete Gesten auf einmal, z.B. zum Einstellen der Schwellwerte
+
+    Die Merkmale aller Blöcke werden gemeinsam berechnet (mit numpy, falls
+    installiert), danach wird jede Geste wie von Apds.get_gesture ausgewertet.
+
+    Args:
+        blocks: N Blöcke mit je 32x4 Bytes (oder ein numpy-Array der Form (N, 32, 4))
+        totals (optional): Anzahl gültiger Datensätze je Block. Defaults to 32.
+        gesture_ids (optional): Kennung je Block, aufeinanderfolgende Blöcke mit gleicher Kennung bilden eine Geste. Defaults to eine Geste je Block.
+        threshold (int, optional): entspricht Apds.THRESHOLD. Defaults to 10.
+        sens1 (float, optional): entspricht Apds.SENS1. Defaults to 15.
+        sens2 (float, optional): entspricht Apds.SENS2. Defaults to 50.
+
+    Returns:
+        List[str]: erkannte Geste je Geste
+    """
+    ud, lr, found = batch_deltas(blocks, totals, threshold)
+    if _numpy() is not None:
+        ud, lr, found = ud.tolist(), lr.tolist(), found.tolist()
+    result = []
+    state = None
+    current = None
+    for i in range(len(found)):
+        gesture_id = i if gesture_ids is None else gesture_ids[i]
+        if state is None or gesture_id != current:
+            if state is not None:
+                decode_into(state)
+                result.append(state.gesmotion)
+            state = GestureState()
+            current = gesture_id
+        if found[i] and accumulate(state, ud[i], lr[i], sens1, sens2):
+            decode_into(state)
+    if state is not None:
+        decode_into(state)
+        result.append(state.gesmotion)
+    return result
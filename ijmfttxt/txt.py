@@ -1,10 +1,62 @@
-from typing import Union
+from typing import Iterator, List, Union
 
-from . import ftrobopy
-from .apds import Apds
+from . import ftrobopy, __version__
+from .apds import Apds, GestureEngine, Sample
 from . import color
 
-from .errors import error_handler
+from .errors import error_handler, UserValueError
+
+
+class _Sampling:
+    # getSample and the background sampling of the light, color and
+    # proximity sensor wrappers, which all share the Apds in self.apds
+
+    @error_handler
+    def getSample(self) -> Sample:
+        """Gibt Helligkeit, Farbwerte und Abstand aus einer einzigen Abfrage zurück
+
+        Läuft die Messung im Hintergrund (startSampling), wird die
+        neueste Messung ohne erneute Abfrage zurückgegeben.
+
+        Returns:
+            Sample: Messwerte mit clear, red, green, blue, proximity und color
+        """
+        sample = self.apds.latest_sample()
+        if sample is not None:
+            return sample
+        return self.apds.sample()
+
+    @error_handler
+    def startSampling(self, rate: float = 50, size: int = 256):
+        """Startet die Messung im Hintergrund, danach antworten alle Abfragen ohne Wartezeit
+
+        Args:
+            rate (float, optional): Messungen pro Sekunde. Defaults to 50.
+            size (int, optional): Anzahl der Messungen, die gespeichert werden. Defaults to 256.
+        """
+        if rate <= 0 or size <= 0:
+            raise UserValueError
+        self.apds.start_sampler(rate, int(size))
+
+    @error_handler
+    def stopSampling(self):
+        """Stoppt die Messung im Hintergrund"""
+        self.apds.stop_sampler()
+
+    @error_handler
+    def getHistory(self, n: Union[None, int] = None) -> List[Sample]:
+        """Gibt die letzten Messungen der Hintergrundmessung zurück, z.B. zum Glätten
+
+        Args:
+            n (int, optional): Anzahl der Messungen. Defaults to alle gespeicherten.
+
+        Returns:
+            List[Sample]: Messungen, die älteste zuerst
+        """
+        sampler = self.apds.sampler
+        if sampler is None:
+            return []
+        return sampler.history(n)
 
 
 class TXT(ftrobopy.ftrobopy):
@@ -12,8 +64,17 @@ class TXT(ftrobopy.ftrobopy):
 
     @error_handler
     def __init__(self, debug: bool = False):
+        print(f"using ijmfttxt {__version__}")
         super().__init__("auto")
         self.debug = debug
+        self._apds: Union[None, Apds] = None
+
+    def _getApds(self) -> Apds:
+        # all sensor wrappers of one controller share one Apds, which is
+        # created and reset only once
+        if self._apds is None:
+            self._apds = Apds(self, self.debug)
+        return self._apds
 
     @error_handler
     def proximitySensor(self):
@@ -23,11 +84,11 @@ class TXT(ftrobopy.ftrobopy):
             prox: Objekt durch das mit dem Abstandsensor kommuniziert werden kann
         """
 
-        class prox:
+        class prox(_Sampling):
             """Klassenwrapper für Abstandssensor-Funktionalitäten der Apds Klasse"""
 
             def __init__(self, outer):
-                self.apds = Apds(outer, outer.debug)
+                self.apds = outer._getApds()
 
             @error_handler
             def turnOn(self):
@@ -46,6 +107,9 @@ class TXT(ftrobopy.ftrobopy):
                 Returns:
                     int: Zahl zwischen 0 und 255
                 """
+                sample = self.apds.latest_sample()
+                if sample is not None:
+                    return sample.proximity
                 return self.apds.get_proximity()
 
         return prox(self)
@@ -58,11 +122,11 @@ class TXT(ftrobopy.ftrobopy):
             light: Objekt durch das mit dem Lichtsensor kommuniziert werden kann
         """
 
-        class light:
+        class light(_Sampling):
             """Klassenwrapper für Lichtsensor-Funktionalitäten der Apds Klasse"""
 
             def __init__(self, outer):
-                self.apds = Apds(outer, outer.debug)
+                self.apds = outer._getApds()
 
             @error_handler
             def turnOn(self):
@@ -81,6 +145,9 @@ class TXT(ftrobopy.ftrobopy):
                 Returns:
                     int: Zahl zwischen 0 und 65536
                 """
+                sample = self.apds.latest_sample()
+                if sample is not None:
+                    return sample.clear
                 try:
                     return self.apds.get_rgbc()[0]
                 except TypeError:
@@ -96,11 +163,11 @@ class TXT(ftrobopy.ftrobopy):
             col: Objekt durch das mit dem Farbsensor kommuniziert werden kann
         """
 
-        class col:
+        class col(_Sampling):
             """Klassenwrapper für Farbsensor-Funktionalitäten der Apds Klasse"""
 
             def __init__(self, outer):
-                self.apds = Apds(outer, outer.debug)
+                self.apds = outer._getApds()
 
             @error_handler
             def turnOn(self):
@@ -119,6 +186,9 @@ class TXT(ftrobopy.ftrobopy):
                 Returns:
                     color.Color: Objekt in dem sämtliche Farbwerte gespeichet sind
                 """
+                sample = self.apds.latest_sample()
+                if sample is not None:
+                    return sample.color
                 return color.Color(*self.apds.get_rgbc())
 
         return col(self)
@@ -135,7 +205,7 @@ class TXT(ftrobopy.ftrobopy):
             """Klassenwrapper für Gestensensor-Funktionalitäten der Apds Klasse"""
 
             def __init__(self, outer):
-                self.apds = Apds(outer, outer.debug)
+                self.apds = outer._getApds()
 
             @error_handler
             def turnOn(self):
@@ -151,13 +221,49 @@ class TXT(ftrobopy.ftrobopy):
             def getGesture(self) -> Union[str, bool]:
                 """Gibt erkannte Geste zurück
 
+                Läuft die Gestenerkennung im Hintergrund (startListening), wird
+                nicht gewartet, sondern die älteste noch nicht abgeholte Geste
+                zurückgegeben.
+
                 Returns:
                     str: mögliche Gesten sind ["NONE", "UP", "DOWN", "LEFT", "RIGHT"]
                 """
+                engine = self.apds.gesture_engine
+                if engine is not None and engine.running:
+                    return engine.get()
                 if self.apds.is_gesture_interrupt():
                     gesture = self.apds.get_gesture()
                 else:
                     gesture = "NONE"
                 return gesture
 
+            @error_handler
+            def startListening(self, interval: float = 0.03, threshold: int = 4):
+                """Startet die Gestenerkennung im Hintergrund
+
+                Args:
+                    interval (float, optional): Abstand zwischen zwei Abfragen des Sensors in Sekunden. Defaults to 0.03.
+                    threshold (int, optional): Füllstand des Gesten-Speichers ab dem er ausgelesen wird (1, 4, 8 oder 16). Defaults to 4.
+                """
+                if threshold not in GestureEngine.FIFO_THRESHOLDS or interval <= 0:
+                    raise UserValueError
+                self.apds.start_gesture_engine(
+                    interval, GestureEngine.FIFO_THRESHOLDS[threshold]
+                )
+
+            @error_handler
+            def stopListening(self):
+                """Stoppt die Gestenerkennung im Hintergrund"""
+                self.apds.stop_gesture_engine()
+
+            @error_handler
+            def gestures(self) -> Iterator[str]:
+                """Gibt nacheinander alle erkannten Gesten zurück, solange die Gestenerkennung im Hintergrund läuft
+
+                Returns:
+                    Iterator[str]: mögliche Gesten sind ["UP", "DOWN", "LEFT", "RIGHT"]
+                """
+                engine = self.apds.start_gesture_engine()
+                return iter(engine)
+
         return ges(self)
@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from ijmfttxt import aiotxt
+from ijmfttxt.ftrobopy import protocol
+
+# request sizes behind the command id
+REQUEST_SIZES = {
+    protocol.QUERY_STATUS_ID: 0,
+    protocol.START_ONLINE_ID: protocol.START_ONLINE.size - 4,
+    protocol.UPDATE_CONFIG_ID: protocol.UPDATE_CONFIG.size - 4,
+    protocol.EXCHANGE_ID: protocol.EXCHANGE.size - 4,
+    protocol.STOP_ONLINE_ID: 0,
+}
+
+RESPONSES = {
+    protocol.QUERY_STATUS_ID: protocol.QUERY_STATUS_RESPONSE.pack(
+        protocol.QUERY_STATUS_RESP_ID, b"TXT", 0
+    ),
+    protocol.START_ONLINE_ID: protocol.RESPONSE.pack(protocol.START_ONLINE_RESP_ID),
+    protocol.UPDATE_CONFIG_ID: protocol.RESPONSE.pack(protocol.UPDATE_CONFIG_RESP_ID),
+    protocol.EXCHANGE_ID: protocol.EXCHANGE_RESPONSE.pack(
+        protocol.EXCHANGE_RESP_ID, *[0] * 51
+    ),
+    protocol.STOP_ONLINE_ID: protocol.RESPONSE.pack(protocol.STOP_ONLINE_RESP_ID),
+}
+
+
+class MuteTXT(object):
+    # accepts the connections and answers every command except those in mute,
+    # which are read but never answered
+
+    def __init__(self, mute):
+        self.mute = mute
+        self.servers = []
+
+    async def start(self):
+        # the i2c channel listens two ports above the main channel
+        while not self.servers:
+            main = await asyncio.start_server(self.main, "127.0.0.1", 0)
+            port = main.sockets[0].getsockname()[1]
+            try:
+                i2c = await asyncio.start_server(self.idle, "127.0.0.1", port + 2)
+            except OSError:
+                main.close()
+                continue
+            self.servers = [main, i2c]
+        return port
+
+    async def stop(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+
+    async def main(self, reader, writer):
+        try:
+            while True:
+                (command,) = protocol.COMMAND.unpack(await reader.readexactly(4))
+                await reader.readexactly(REQUEST_SIZES[command])
+                if command not in self.mute:
+                    writer.write(RESPONSES[command])
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def idle(self, reader, writer):
+        await reader.read()
+        writer.close()
+
+
+class TestClose(unittest.TestCase):
+    def close_against(self, mute):
+        async def run():
+            server = MuteTXT(mute)
+            txt = aiotxt.AsyncTXT("127.0.0.1", await server.start())
+            try:
+                await asyncio.wait_for(txt.connect(), 1.0)
+                await asyncio.sleep(0.05)
+                # close() takes a few steps of CLOSE_TIMEOUT at most
+                await asyncio.wait_for(txt.close(), 2.0)
+            finally:
+                await server.stop()
+            return txt
+
+        with mock.patch.object(aiotxt, "CLOSE_TIMEOUT", 0.1):
+            return asyncio.run(run())
+
+    def test_close_without_exchange_response(self):
+        txt = self.close_against({protocol.EXCHANGE_ID})
+        self.assertFalse(txt.online)
+
+    def test_close_without_stop_online_response(self):
+        txt = self.close_against({protocol.STOP_ONLINE_ID})
+        self.assertFalse(txt.online)
+        self.assertGreater(txt.cycle, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from array import array
+
+from ijmfttxt.ftrobopy.ftrobopy import compBuffer
+
+
+def frame(run, value=7):
+    # one 16 bit word, run unchanged words and a word changed to 0
+    previous = [value] * (run + 2)
+    words = list(previous)
+    words[0] = 300
+    words[-1] = 0
+    return words, previous
+
+
+def mixed():
+    previous = [0] * 54
+    words = list(previous)
+    words[0] = 8
+    words[1] = 1
+    words[5] = 0x1234
+    words[53] = 512
+    return words, previous
+
+
+def toggles():
+    previous = mixed()[0]
+    words = list(previous)
+    words[0] = 0
+    words[1] = 0
+    words[20] = 0xFFFF
+    words[30] = 1
+    return words, previous
+
+
+# compressed frames and CRCs of the encoder before AddWords, which called
+# AddWord(0, word_for_crc=w) for unchanged words, AddWord(1, word_for_crc=0)
+# for words changed to 0 and AddWord(w) for all others
+GOLDEN = [
+    ("unchanged", ([0] * 54, [0] * 54), "fd22", 0x3040C10F),
+    ("mixed", mixed(), "230058d348f46f0c2000", 0x0D0D0085),
+    ("toggles", toggles(), "dafdff7f93fd03", 0x43E27D9C),
+    # no change runs coded in the 2 bit count
+    ("run 1", frame(1), "b30420", 0x462173B5),
+    ("run 2", frame(2), "b30484", 0x4ECC3F28),
+    ("run 4", frame(4), "b304a4", 0xB67A7F23),
+    # 4 bit count
+    ("run 5", frame(5), "b3043408", 0xE2BE46AF),
+    ("run 19", frame(19), "b304b40b", 0x50403294),
+    # 8 bit count
+    ("run 20", frame(20), "b304f40308", 0x520EC0BD),
+    ("run 274", frame(274), "b304f4fb0b", 0x31A6F017),
+    # 16 bit count
+    ("run 275", frame(275), "b304f4ff030008", 0xFC5E30C0),
+    ("run 4370", frame(4370), "b304f4ffff3f08", 0x57BE986E),
+    # longer runs are split
+    ("run 4371", frame(4371), "b304f4ffff3f20", 0x7A0DE3C4),
+    ("run 5000", frame(5000), "b304f4ffff3ff4ff8f0508", 0xEC6E25CD),
+]
+
+
+def decoded(words, previous):
+    # what the TXT reads: unchanged words as 0, toggles as 1
+    return [0 if w == p else (1 if w in (0, 1) else w) for w, p in zip(words, previous)]
+
+
+class TestCompBuffer(unittest.TestCase):
+    def test_add_words(self):
+        buf = compBuffer()
+        for name, (words, previous), data, crc in GOLDEN:
+            with self.subTest(name):
+                buf.Reset()
+                buf.AddWords(words, previous)
+                buf.Finish()
+                self.assertEqual(bytes(buf.GetCompBuffer()).hex(), data)
+                self.assertEqual(buf.m_crc.m_crc, crc)
+
+    def test_add_word(self):
+        for name, (words, previous), data, crc in GOLDEN:
+            with self.subTest(name):
+                buf = compBuffer()
+                for w, p in zip(words, previous):
+                    if w == p:
+                        buf.AddWord(0, word_for_crc=w)
+                    elif w == 0:
+                        buf.AddWord(1, word_for_crc=0)
+                    else:
+                        buf.AddWord(w)
+                buf.Finish()
+                self.assertEqual(bytes(buf.GetCompBuffer()).hex(), data)
+                self.assertEqual(buf.m_crc.m_crc, crc)
+
+    def test_get_words(self):
+        buf = compBuffer()
+        for name, (words, previous), data, crc in GOLDEN:
+            with self.subTest(name):
+                out = array("H", bytes(2 * len(words)))
+                buf.Reset()
+                buf.m_compressed = memoryview(bytes.fromhex(data))
+                buf.GetWords(out)
+                self.assertEqual(out.tolist(), decoded(words, previous))
+
+    def test_get_words_in_parts(self):
+        # a run may continue across two calls
+        words, previous = frame(275)
+        out = array("H", bytes(2 * len(words)))
+        buf = compBuffer()
+        buf.m_compressed = bytes.fromhex("b304f4ff030008")
+        buf.GetWords(out, 100)
+        buf.GetWords(memoryview(out)[100:])
+        self.assertEqual(out.tolist(), decoded(words, previous))
+
+    def test_get_word(self):
+        words, previous = toggles()
+        buf = compBuffer()
+        buf.m_compressed = "".join(map(chr, bytes.fromhex("dafdff7f93fd03")))
+        self.assertEqual([buf.GetWord() for _ in words], decoded(words, previous))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import importlib
+import unittest
+
+from ijmfttxt.ftrobopy.ftrobopy import CRC32, crc_words
+
+# the package exports the ftrobopy class under the name of the module
+ftrobopy = importlib.import_module("ijmfttxt.ftrobopy.ftrobopy")
+
+
+class TestCRC(unittest.TestCase):
+    GOLDEN = [
+        ([], 0xFFFFFFFF),
+        ([0], 0x00B7647D),
+        ([1, 2, 3], 0x7D85A428),
+        ([0xFFFF] * 54, 0xD9BD5D4D),
+        (list(range(100)), 0xC39A8EDF),
+    ]
+
+    def test_crc_words(self):
+        for words, crc in self.GOLDEN:
+            with self.subTest(len(words)):
+                self.assertEqual(crc_words(words), crc)
+
+    def test_continue(self):
+        words = list(range(100))
+        self.assertEqual(crc_words(words[40:], crc_words(words[:40])), 0xC39A8EDF)
+
+    def test_add_16bit(self):
+        for words, crc in self.GOLDEN:
+            with self.subTest(len(words)):
+                c = CRC32()
+                for word in words:
+                    c.Add16bit(word)
+                self.assertEqual(c.m_crc, crc)
+                c.Reset()
+                c.Add16bitWords(words)
+                self.assertEqual(c.m_crc, crc)
+
+    def test_without_zlib(self):
+        zlib = ftrobopy.zlib
+        ftrobopy.zlib = None
+        try:
+            for words, crc in self.GOLDEN:
+                self.assertEqual(crc_words(words), crc)
+        finally:
+            ftrobopy.zlib = zlib
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+from unittest import mock
+
+from ijmfttxt import aiotxt
+from ijmfttxt.fleet import TXTFleet, _LoopThread
+from ijmfttxt.ftrobopy import protocol
+
+from test_aiotxt import MuteTXT
+
+
+class TestFleet(unittest.TestCase):
+    def setUp(self):
+        # the servers run in a loop of their own, like real controllers
+        self.thread = _LoopThread()
+        self.thread.start()
+        self.servers = []
+
+    def tearDown(self):
+        for server in self.servers:
+            self.thread.call(server.stop())
+        self.thread.stop()
+
+    def fleet(self, *mutes):
+        self.servers = [MuteTXT(mute) for mute in mutes]
+        ports = [self.thread.call(server.start()) for server in self.servers]
+        return TXTFleet([("127.0.0.1", port) for port in ports], timeout=0.5)
+
+    @mock.patch.object(aiotxt, "CLOSE_TIMEOUT", 0.1)
+    def test_stalled_controller(self):
+        # the second controller stops answering after the handshake
+        fleet = self.fleet(set(), {protocol.EXCHANGE_ID})
+        try:
+            self.assertEqual(list(fleet.connect().values()), [True, True])
+            fleet.start_all([8, 0, 0, 0])
+            fleet.stop_all()
+            health = list(fleet.health().values())
+            self.assertIsNone(health[0]["error"])
+            self.assertIn("TimeoutError", health[1]["error"])
+        finally:
+            fleet.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+
+from ijmfttxt import gesture
+
+
+def swipe(axis, forward, n=20):
+    # n datasets in which one channel of the axis falls while the other rises
+    data = bytearray()
+    for i in range(n):
+        a, b = 200 - i * 8, 40 + i * 8
+        if not forward:
+            a, b = b, a
+        channels = [100, 100, a, b] if axis == "lr" else [a, b, 100, 100]
+        data += bytes(channels)
+    return bytes(data) + bytes(gesture.BLOCK_SIZE - len(data))
+
+
+def drift(n=8):
+    # a slow up movement, too small for a gesture within one block
+    data = bytearray()
+    for i in range(n):
+        step = round(10 * i / (n - 1))
+        data += bytes([110 - step, 90 + step, 100, 100])
+    return bytes(data) + bytes(gesture.BLOCK_SIZE - len(data))
+
+
+class TestGesture(unittest.TestCase):
+    def test_first_last(self):
+        block = swipe("ud", True)
+        self.assertEqual(
+            gesture.first_last(block, 20, 10),
+            ((200, 40, 100, 100), (48, 192, 100, 100)),
+        )
+        self.assertIsNone(gesture.first_last(bytes(gesture.BLOCK_SIZE), 32, 10))
+        self.assertIsNone(gesture.first_last(block, 0, 10))
+
+    def test_chunk_deltas(self):
+        ud, lr = gesture.chunk_deltas(swipe("lr", False), 20, 10)
+        self.assertEqual(ud, 0)
+        self.assertAlmostEqual(lr, 380 / 3)
+        self.assertEqual(gesture.chunk_deltas(drift(), 8, 10), (-10.0, 0.0))
+        # at most 4 datasets are not evaluated
+        self.assertIsNone(gesture.chunk_deltas(swipe("ud", True), 4, 10))
+
+    def test_decode(self):
+        self.assertEqual(gesture.decode(-1, 0, -20, 0), "UP")
+        self.assertEqual(gesture.decode(1, 0, 20, 0), "DOWN")
+        self.assertEqual(gesture.decode(0, 1, 0, 20), "RIGHT")
+        self.assertEqual(gesture.decode(0, -1, 0, -20), "LEFT")
+        self.assertEqual(gesture.decode(-1, 1, -30, 20), "UP")
+        self.assertEqual(gesture.decode(-1, 1, -20, 30), "RIGHT")
+        self.assertEqual(gesture.decode(0, 0, 0, 0), "NONE")
+
+    def classify(self, *args, **kwargs):
+        # classifies with numpy, if installed, and with the pure python path
+        # and checks that both agree
+        result = gesture.classify(*args, **kwargs)
+        with mock.patch.object(gesture, "_numpy", lambda: None):
+            self.assertEqual(gesture.classify(*args, **kwargs), result)
+        return result
+
+    def test_classify(self):
+        blocks = [
+            swipe("ud", True),
+            swipe("ud", False),
+            swipe("lr", True),
+            swipe("lr", False),
+            bytes(gesture.BLOCK_SIZE),
+            swipe("ud", True),
+        ]
+        self.assertEqual(
+            self.classify(blocks, [20, 20, 20, 20, 32, 4]),
+            ["UP", "DOWN", "LEFT", "RIGHT", "NONE", "NONE"],
+        )
+
+    def test_classify_gesture_ids(self):
+        # the movements of blocks with the same id add up to one gesture
+        blocks = [drift(), drift(), drift()]
+        self.assertEqual(self.classify(blocks, [8, 8, 8]), ["NONE"] * 3)
+        self.assertEqual(
+            self.classify(blocks, [8, 8, 8], gesture_ids=["a", "a", "b"]),
+            ["UP", "NONE"],
+        )
+
+    def test_classify_empty(self):
+        self.assertEqual(self.classify([]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()